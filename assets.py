@@ -0,0 +1,195 @@
+"""
+Static asset build: fingerprinted, recompressed copies of static/css, js and images.
+
+    python assets.py            # writes static/dist/ and static/dist/manifest.json
+    python assets.py --clean    # start from an empty static/dist/
+
+Every file is copied to static/dist/ under a name carrying a hash of its
+content (css/style.3f9a0c2b1d7e.css), so its URL changes exactly when the file
+does and browsers may cache it for a year without revalidating. CSS/JS also
+get .gz (and .br, if the brotli package is installed) siblings that app.py
+serves to clients accepting them. Images are shrunk to the size the pages
+show them at and written as AVIF and WebP plus a JPEG/PNG fallback.
+
+manifest.json maps the source path ("css/style.css") to the built files;
+asset_url() / asset_picture() in app.py read it and fall back to the plain
+static file for anything not built (or when there is no manifest at all).
+Old hashed files are kept so pages cached before a deploy still load.
+"""
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import uuid
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_FOLDER = 'static'
+DIST_FOLDER = os.path.join(STATIC_FOLDER, 'dist')
+MANIFEST_PATH = os.path.join(DIST_FOLDER, 'manifest.json')
+SOURCE_DIRS = ('css', 'js', 'images')
+TEXT_TYPES = ('.css', '.js', '.svg')
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+HASH_LENGTH = 12
+
+# Widest the pages ever draw an image (CSS px, x2 for HiDPI); first matching pattern wins
+IMAGE_MAX_WIDTH = (
+    ('images/doctor*', 640),          # .doctor-img cards, 200 px round avatar on doctor pages
+    ('images/shield.png', 256),       # report PDF logo, printed 12 mm wide
+    ('images/*', 1280),               # slides / hospital heroes, full content width
+)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+
+def fingerprint(rel_path, data, ext=None):
+    stem, src_ext = os.path.splitext(rel_path)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{ext or src_ext}"
+
+
+def write_dist(rel_path, data):
+    path = os.path.join(DIST_FOLDER, rel_path)
+    if os.path.exists(path):
+        return                        # same name = same content
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_text(rel_path, data):
+    name = fingerprint(rel_path, data)
+    write_dist(name, data)
+    # mtime=0: the same input always gives the same .gz bytes
+    write_dist(name + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_dist(name + '.br', brotli.compress(data, quality=11))
+    return {'file': name, 'size': len(data)}
+
+
+def max_width(rel_path):
+    for pattern, width in IMAGE_MAX_WIDTH:
+        if fnmatch.fnmatch(rel_path, pattern):
+            return width
+    return None
+
+
+def encode(img, fmt, **options):
+    out = io.BytesIO()
+    img.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def build_image(rel_path, data):
+    from PIL import Image, ImageOps, features
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+    img = img.convert('RGBA' if has_alpha else 'RGB')
+    width = max_width(rel_path)
+    if width and img.width > width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    if has_alpha and img.getchannel('A').getextrema()[0] == 255:
+        img, has_alpha = img.convert('RGB'), False     # alpha channel that is fully opaque anyway
+
+    if has_alpha:
+        fallback, ext = encode(img, 'PNG', optimize=True), '.png'
+    else:
+        fallback, ext = encode(img, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True), '.jpg'
+    entry = {'file': fingerprint(rel_path, fallback, ext), 'width': img.width, 'height': img.height,
+             'size': len(fallback)}
+    write_dist(entry['file'], fallback)
+
+    webp = encode(img, 'WEBP', quality=WEBP_QUALITY, method=6)
+    entry['webp'] = fingerprint(rel_path, webp, '.webp')
+    write_dist(entry['webp'], webp)
+    if features.check('avif'):
+        avif = encode(img, 'AVIF', quality=AVIF_QUALITY)
+        entry['avif'] = fingerprint(rel_path, avif, '.avif')
+        write_dist(entry['avif'], avif)
+    return entry
+
+
+def sources():
+    for folder in SOURCE_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(STATIC_FOLDER, folder)):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, STATIC_FOLDER).replace(os.sep, '/'), path
+
+
+def build(clean=False, verbose=True):
+    if clean:
+        shutil.rmtree(DIST_FOLDER, ignore_errors=True)
+    os.makedirs(DIST_FOLDER, exist_ok=True)
+    manifest = {}
+    before = after = 0
+    for rel_path, path in sources():
+        ext = os.path.splitext(rel_path)[1].lower()
+        with open(path, 'rb') as f:
+            data = f.read()
+        if ext in TEXT_TYPES:
+            entry = build_text(rel_path, data)
+        elif ext in IMAGE_TYPES:
+            entry = build_image(rel_path, data)
+        else:
+            entry = {'file': fingerprint(rel_path, data), 'size': len(data)}
+            write_dist(entry['file'], data)
+        manifest[rel_path] = entry
+        before += len(data)
+        after += entry['size']
+        if verbose:
+            print(f"{rel_path:28} {len(data) / 1024:9.1f} KB -> {entry['size'] / 1024:8.1f} KB  {entry['file']}")
+    tmp = MANIFEST_PATH + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+    if verbose:
+        print(f"{len(manifest)} assets, {before / 1024:.0f} KB -> {after / 1024:.0f} KB "
+              f"(fallback formats; WebP/AVIF are smaller still){'' if brotli else ', no brotli package: .gz only'}")
+    return manifest
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """{source path: entry} of the last build, or {} if assets were never built."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_fingerprinted(rel_path):
+    """True for built file names carrying a content hash (css/style.3f9a0c2b1d7e.css[.gz])."""
+    parts = os.path.basename(rel_path).split('.')
+    return any(len(part) == HASH_LENGTH and all(c in '0123456789abcdef' for c in part) for part in parts[1:-1])
+
+
+def built_path(rel_path, manifest=None):
+    """Filesystem path of the built fallback file for a static path, else the source file."""
+    entry = (manifest if manifest is not None else load_manifest()).get(rel_path)
+    if entry and os.path.exists(os.path.join(DIST_FOLDER, entry['file'])):
+        return os.path.join(DIST_FOLDER, entry['file'])
+    return os.path.join(STATIC_FOLDER, rel_path)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clean', action='store_true', help="delete static/dist/ first")
+    args = parser.parse_args(argv[1:])
+    build(clean=args.clean)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,85 @@
+"""
+Micro-batching: coalesce concurrent single-item calls into one batched call.
+
+Request threads call submit(item) and block. A background thread collects
+items until either max_batch items are waiting or max_wait seconds have passed
+since the first one, calls handle_batch(items) once, and hands each caller its
+own result (or exception). Batch sizes and the time items spent queued are
+recorded per batcher (see metrics.py).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+batch_sizes = metrics.histogram('micro_batch_size', "Items per flushed micro-batch.", ('batcher',),
+                                buckets=metrics.COUNT_BUCKETS)
+queue_wait = metrics.histogram('micro_batch_queue_wait_seconds',
+                               "Time an item waited in a micro-batcher queue before its batch ran.", ('batcher',))
+
+
+class MicroBatcher:
+    def __init__(self, handle_batch, max_batch=64, max_wait=0.005, name='micro-batcher'):
+        self.handle_batch = handle_batch  # list of items -> list of results/exceptions, same order
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item, timeout=None):
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        self._ensure_thread()
+        return future.result(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            batch_sizes.observe(len(batch), self.name)
+            for _, _, queued in batch:
+                queue_wait.observe(started - queued, self.name)
+            try:
+                results = self.handle_batch([item for item, _, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,106 @@
+"""
+Prediction latency with and without per-feature attributions.
+
+Uses the served model (models/CURRENT or model.npz) through app.py and rows
+resampled from diabetes/diabetes.csv. Reports:
+
+    index    one-time cost of CompiledForest.contribution_index() (time, MB)
+    model    predict_proba vs predict_proba_contributions on scaled rows, per batch size
+    panel    app.predict_panels() for single panels (scaler + model + outcome),
+             REPORTCARE_ATTRIBUTIONS off vs on, prediction cache bypassed
+
+It also checks that baseline + contributions reproduces every probability.
+
+    python benchmarks/bench_attributions.py --repeat 200 --json attributions.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DATA_PATH = os.path.join(ROOT, 'diabetes', 'diabetes.csv')
+BATCH_SIZES = (1, 8, 32, 256)
+
+
+def sample_rows(n, seed=0):
+    """diabetes.csv feature rows with +-5% noise, in panel_features() order."""
+    with open(DATA_PATH) as f:
+        rows = [[float(v) for v in row[:8]] for row in csv.reader(f) if row and row[0][:1].isdigit()]
+    rng = random.Random(seed)
+    return np.array([[v * rng.uniform(0.95, 1.05) for v in rng.choice(rows)] for _ in range(n)])
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    import app as app_module
+    from forest import CompiledForest
+    current = app_module.current_model()
+    forest = current.model
+    if not isinstance(forest, CompiledForest):
+        sys.exit("attributions need the compiled forest (model.npz); run 'python forest.py' first")
+    results = {'model_version': current.version, 'trees': forest.n_estimators, 'nodes': forest.node_count}
+
+    t0 = time.perf_counter()
+    _, leaf_contrib, bias = forest.contribution_index()
+    results['index'] = {'build_s': round(time.perf_counter() - t0, 3), 'mb': round(leaf_contrib.nbytes / 1e6, 1)}
+    print(f"index    built in {results['index']['build_s']:.3f}s, {results['index']['mb']} MB "
+          f"({forest.n_estimators} trees, {forest.node_count} nodes)")
+
+    rows = sample_rows(max(BATCH_SIZES) * 4)
+    scaled = current.scaler.transform(rows)
+    proba, contributions, bias = forest.predict_proba_contributions(scaled)
+    error = float(np.abs(proba[:, -1] - (bias + contributions.sum(axis=1))).max())
+    results['max_sum_error'] = error
+    print(f"check    max |p - (baseline + sum(contributions))| = {error:.2e}")
+
+    results['model'] = []
+    for size in BATCH_SIZES:
+        batch = scaled[:size]
+        plain = median_ms(lambda: forest.predict_proba(batch), args.repeat)
+        explained = median_ms(lambda: forest.predict_proba_contributions(batch), args.repeat)
+        results['model'].append({'rows': size, 'predict_ms': round(plain, 3), 'with_attributions_ms': round(explained, 3)})
+        print(f"model    {size:4d} rows   predict_proba {plain:8.3f} ms   +attributions {explained:8.3f} ms   "
+              f"({(explained / plain - 1) * 100:+.1f}%)")
+
+    results['panel'] = {}
+    panels = [list(row) for row in rows]
+    for explain in (False, True):
+        app_module.ATTRIBUTIONS = explain
+        it = iter(range(10 ** 9))
+
+        def one():
+            app_module.prediction_cache.clear()
+            app_module.predict_panels([panels[next(it) % len(panels)]])
+        results['panel']['on' if explain else 'off'] = round(median_ms(one, args.repeat), 3)
+    print(f"panel    predict_panels, 1 panel: attributions off {results['panel']['off']:.3f} ms, "
+          f"on {results['panel']['on']:.3f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Query-plan and latency benchmark for the hot-path indexes (migration 0001).
+
+Seeds a throwaway SQLite database with the original, index-free schema,
+times the queries the hot routes run, applies migrations.upgrade() and times
+them again.
+
+    python benchmarks/bench_indexes.py --reports 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+import migrations
+
+# users.db schema as created by db.create_all() before migration 0001
+BASE_SCHEMA = """
+CREATE TABLE user (id INTEGER NOT NULL, role VARCHAR(20), email VARCHAR(100) NOT NULL,
+    password VARCHAR(100) NOT NULL, name VARCHAR(100), phone VARCHAR(20), address TEXT,
+    license_no VARCHAR(100), profile_pic VARCHAR(200), signature_img VARCHAR(200),
+    PRIMARY KEY (id), UNIQUE (email));
+CREATE TABLE patient (id INTEGER NOT NULL, lab_id INTEGER, name VARCHAR(100) NOT NULL,
+    age INTEGER, gender VARCHAR(10), phone VARCHAR(20), created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(lab_id) REFERENCES user (id));
+CREATE TABLE report (id INTEGER NOT NULL, patient_id INTEGER, prediction_result VARCHAR(100),
+    accuracy VARCHAR(20), glucose FLOAT, bp FLOAT, insulin FLOAT, bmi FLOAT, pregnancies INTEGER,
+    skin FLOAT, dpf FLOAT, remarks TEXT, date DATETIME, risk_score FLOAT,
+    PRIMARY KEY (id), FOREIGN KEY(patient_id) REFERENCES patient (id));
+CREATE TABLE analysis (id INTEGER NOT NULL, user_id INTEGER, age INTEGER, gender VARCHAR(20),
+    result VARCHAR(10), accuracy VARCHAR(10), timestamp DATETIME, PRIMARY KEY (id));
+"""
+
+# (label, SQL, parameter factory) - the statements behind the hot routes
+QUERIES = [
+    ("predict / view_patients: patients of a lab",
+     "SELECT id, name FROM patient WHERE lab_id = ?",
+     lambda s: (random.randint(1, s.labs),)),
+    ("patient_history: newest page of a patient",
+     "SELECT id, date, prediction_result FROM report WHERE patient_id = ? "
+     "ORDER BY date DESC, id DESC LIMIT 26",
+     lambda s: (random.randint(1, s.patients),)),
+    ("verify_process: latest report of a patient",
+     "SELECT * FROM report WHERE patient_id = ? ORDER BY date DESC LIMIT 1",
+     lambda s: (random.randint(1, s.patients),)),
+    ("generated_reports: newest page of a lab",
+     "SELECT report.id, report.date, patient.name FROM report JOIN patient ON report.patient_id = patient.id "
+     "WHERE patient.lab_id = ? ORDER BY report.date DESC, report.id DESC LIMIT 26",
+     lambda s: (random.randint(1, s.labs),)),
+    ("my_history / api_history: analyses of a user",
+     "SELECT timestamp, result, accuracy FROM analysis WHERE user_id = ? ORDER BY timestamp DESC LIMIT 50",
+     lambda s: (random.randint(1, s.labs),)),
+    ("global_search: labs by role",
+     "SELECT id, name FROM user WHERE role = 'Lab' AND name >= ? ORDER BY name LIMIT 20",
+     lambda s: ("Lab 1",)),
+]
+
+
+def seed(path, args):
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executescript(BASE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO user (id, role, email, password, name) VALUES (?, ?, ?, ?, ?)",
+        [(i, 'Lab' if i <= args.labs else 'User', f"user{i}@bench.local", 'x', f"Lab {i}")
+         for i in range(1, args.labs * 2 + 1)])
+    conn.executemany(
+        "INSERT INTO patient (id, lab_id, name, age, gender, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, rnd.randint(1, args.labs), f"Patient {i}", rnd.randint(20, 80), 'Female', datetime(2025, 1, 1))
+         for i in range(1, args.patients + 1)])
+
+    start = datetime(2025, 1, 1)
+    batch = 50_000
+    for first in range(0, args.reports, batch):
+        n = min(batch, args.reports - first)
+        reports, analyses = [], []
+        for _ in range(n):
+            when = start + timedelta(seconds=rnd.randint(0, 365 * 86400))
+            risk = rnd.uniform(0, 100)
+            result = 'Diabetic' if risk > 50 else 'Normal'
+            reports.append((rnd.randint(1, args.patients), result, '98.5%', rnd.uniform(70, 200),
+                            rnd.uniform(50, 100), rnd.uniform(0, 300), rnd.uniform(18, 45), when, risk))
+            analyses.append((rnd.randint(1, args.labs), rnd.randint(20, 80), 'N/A', result, '98.5%', when))
+        conn.executemany(
+            "INSERT INTO report (patient_id, prediction_result, accuracy, glucose, bp, insulin, bmi, date, risk_score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", reports)
+        conn.executemany(
+            "INSERT INTO analysis (user_id, age, gender, result, accuracy, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            analyses)
+        conn.commit()
+    conn.close()
+
+
+def measure(path, args):
+    conn = sqlite3.connect(path)
+    results = {}
+    for label, sql, params in QUERIES:
+        plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params(args))]
+        timings = []
+        for _ in range(args.repeat):
+            p = params(args)
+            t0 = time.perf_counter()
+            conn.execute(sql, p).fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[label] = (plan, statistics.median(timings))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--labs', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=50_000)
+    parser.add_argument('--reports', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', help="database file to use (default: a temp file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    t0 = time.perf_counter()
+    seed(path, args)
+    print(f"Seeded {args.reports:,} reports / {args.patients:,} patients in {time.perf_counter() - t0:.1f}s -> {path}\n")
+
+    before = measure(path, args)
+    t0 = time.perf_counter()
+    migrations.upgrade(create_engine(f"sqlite:///{path}"))
+    print(f"migrations.upgrade() took {time.perf_counter() - t0:.1f}s\n")
+    after = measure(path, args)
+
+    for label, _, _ in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[label], after[label]
+        print(label)
+        print(f"  before: {ms_before:9.3f} ms   {' | '.join(plan_before)}")
+        print(f"  after:  {ms_after:9.3f} ms   {' | '.join(plan_after)}")
+        print(f"  speedup: {ms_before / ms_after:.0f}x\n" if ms_after else "")
+
+
+if __name__ == '__main__':
+    main()
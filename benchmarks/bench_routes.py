@@ -0,0 +1,403 @@
+"""
+Route benchmark and load test: throughput, latency and memory per endpoint.
+
+Seeds a throwaway SQLite database (labs, patients and reports whose lab
+values are resampled from diabetes/diabetes.csv), then drives the hot routes
+
+    predict            POST /api/predict (existing patient)
+    download_report    GET  /download-report/<id>
+    dashboard          GET  /dashboard
+    global_search      GET  /global-search?q=...
+    verify_process     POST /verify-process
+    generated_reports  GET  /my-generated-reports
+
+first in-process through the Flask test client (sequential: latency, peak
+Python allocation per request, RSS), then with --http against a real server
+process hammered by concurrent keep-alive clients (throughput, latency, server
+RSS). Results go to --json together with the git revision and the scale, and
+--compare prints the change against an earlier results file:
+
+    python benchmarks/bench_routes.py --patients 20000 --reports 100000 --http --json before.json
+    python benchmarks/bench_routes.py --patients 20000 --reports 100000 --http --json after.json --compare before.json
+
+Needs a trained model (python train.py) in the repository root.
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_predict_writes import free_port
+
+DATA_PATH = os.path.join(ROOT, 'diabetes', 'diabetes.csv')
+FIRST = ['Aarav', 'Anaya', 'Rohan', 'Priya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Ishaan', 'Meera',
+         'John', 'Maria', 'David', 'Sarah', 'Ahmed', 'Fatima', 'Chen', 'Yuki', 'Lucas', 'Emma']
+LAST = ['Sharma', 'Verma', 'Gupta', 'Singh', 'Patel', 'Reddy', 'Iyer', 'Khan', 'Das', 'Mehta']
+SEARCH_TERMS = ['a', 'pr', 'meh', 'rohan', 'kav', 'sarah', 'diag', 'xyz']
+PASSWORD = 'bench'
+ENDPOINTS = ('predict', 'download_report', 'dashboard', 'global_search', 'verify_process', 'generated_reports')
+SEED_BATCH = 20_000
+
+
+# -------------------- SEED --------------------
+def load_rows(path=DATA_PATH):
+    with open(path, newline='') as f:
+        return [{k: float(v) for k, v in row.items()} for row in csv.DictReader(f)]
+
+
+def sample_panel(rnd, rows):
+    """A diabetes.csv row with +-5% noise, so the lab values follow the dataset's distribution."""
+    row = rnd.choice(rows)
+    jitter = lambda v: max(v * rnd.uniform(0.95, 1.05), 0.0)
+    return row, {
+        'pregnancies': int(row['Pregnancies']), 'glucose': round(jitter(row['Glucose']), 1),
+        'bp': round(jitter(row['BloodPressure']), 1), 'skin': round(jitter(row['SkinThickness']), 1),
+        'insulin': round(jitter(row['Insulin']), 1), 'bmi': round(jitter(row['BMI']), 1),
+        'dpf': round(jitter(row['DiabetesPedigreeFunction']), 3),
+    }
+
+
+def seed(app_module, args):
+    """Fill the (empty) app database through the app's own models; returns the seeded ids."""
+    from sqlalchemy import insert
+    m = app_module
+    rnd = random.Random(args.seed)
+    rows = load_rows()
+    m.init_db()
+    with m.app.app_context():
+        m.db.session.execute(insert(m.User), [
+            {'role': 'Lab', 'email': f"lab{i}@bench.local", 'password': PASSWORD,
+             'name': f"{rnd.choice(LAST)} Diagnostics {i}", 'license_no': f"LAB-{i:04d}",
+             'phone': '9999999999', 'address': f"{i} Bench Road"}
+            for i in range(1, args.labs + 1)])
+        lab_ids = [u.id for u in m.User.query.order_by(m.User.id)]
+
+        patient_ages = {}
+        for first in range(0, args.patients, SEED_BATCH):
+            n = min(SEED_BATCH, args.patients - first)
+            batch = []
+            for _ in range(n):
+                row = rnd.choice(rows)
+                batch.append({'lab_id': rnd.choice(lab_ids), 'age': int(row['Age']),
+                              'name': f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.randint(1, 99999)}",
+                              'gender': rnd.choice(('Female', 'Male')), 'created_at': datetime(2025, 1, 1)})
+            ids = m.db.session.scalars(insert(m.Patient).returning(m.Patient.id, sort_by_parameter_order=True),
+                                       batch).all()
+            patient_ages.update(zip(ids, (p['age'] for p in batch)))
+        patient_ids = list(patient_ages)
+
+        start = datetime(2025, 1, 1)
+        for first in range(0, args.reports, SEED_BATCH):
+            batch = []
+            for _ in range(min(SEED_BATCH, args.reports - first)):
+                row, panel = sample_panel(rnd, rows)
+                risk = round(rnd.uniform(55, 100) if row['Outcome'] else rnd.uniform(0, 45), 2)
+                batch.append(dict(panel, patient_id=rnd.choice(patient_ids),
+                                  prediction_result='Diabetic' if row['Outcome'] else 'Normal',
+                                  accuracy='98.5%', risk_score=risk,
+                                  remarks=f"Risk Level: {m.risk_level_for(risk)}. ",
+                                  date=start + timedelta(seconds=rnd.randint(0, 365 * 86400))))
+            m.db.session.execute(insert(m.Report), batch)
+        m.rebuild_lab_stats()
+        m.refresh_verification()
+        m.db.session.commit()
+        with m.db.engine.begin() as conn:
+            m.search_index.rebuild(conn)
+
+        lab_id = lab_ids[0]
+        lab_patients = [pid for (pid,) in m.db.session.query(m.Patient.id).filter_by(lab_id=lab_id)]
+        lab_reports = [rid for (rid,) in m.db.session.query(m.Report.id).join(m.Patient)
+                       .filter(m.Patient.lab_id == lab_id)]
+    return {'lab_email': f"lab{lab_id}@bench.local", 'lab_patients': lab_patients, 'lab_reports': lab_reports,
+            'patient_ids': patient_ids, 'patient_ages': patient_ages, 'panel_rows': rows}
+
+
+# -------------------- WORKLOAD --------------------
+def make_request(name, rnd, ids):
+    """(method, path, body, content type) for one request to endpoint `name`."""
+    if name == 'predict':
+        pid = rnd.choice(ids['lab_patients'])
+        _, panel = sample_panel(rnd, ids['panel_rows'])
+        body = dict(panel, mode='existing', patient_id=pid, age=ids['patient_ages'][pid])
+        return 'POST', '/api/predict', json.dumps(body), 'application/json'
+    if name == 'download_report':
+        return 'GET', f"/download-report/{rnd.choice(ids['lab_reports'])}", None, None
+    if name == 'dashboard':
+        return 'GET', '/dashboard', None, None
+    if name == 'global_search':
+        return 'GET', '/global-search?' + urllib.parse.urlencode({'q': rnd.choice(SEARCH_TERMS)}), None, None
+    if name == 'verify_process':
+        form = urllib.parse.urlencode({'report_id': f"PAT-{rnd.choice(ids['patient_ids']):03d}"})
+        return 'POST', '/verify-process', form, 'application/x-www-form-urlencoded'
+    if name == 'generated_reports':
+        return 'GET', '/my-generated-reports', None, None
+    raise ValueError(name)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+def latency_summary(latencies_ms, seconds):
+    latencies_ms = sorted(latencies_ms)
+    return {
+        'requests': len(latencies_ms),
+        'throughput_rps': round(len(latencies_ms) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 0.50), 2),
+        'p95_ms': round(percentile(latencies_ms, 0.95), 2),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 2),
+    }
+
+
+def rss_mb(pid='self'):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if pid == 'self' else None
+
+
+# -------------------- IN-PROCESS (Flask test client) --------------------
+def run_test_client(app_module, ids, args):
+    client = app_module.app.test_client()
+    response = client.post('/login', data={'email': ids['lab_email'], 'password': PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError("could not log in as the seeded lab")
+
+    results = {}
+    for name in args.endpoints:
+        rnd = random.Random(f"{args.seed}-{name}")
+
+        def call():
+            method, path, body, content_type = make_request(name, rnd, ids)
+            response = client.open(path, method=method, data=body, content_type=content_type)
+            response.get_data()
+            return response.status_code
+
+        for _ in range(args.warmup):
+            call()
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            status = call()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += status >= 400
+        elapsed = time.perf_counter() - started
+
+        # Separate pass: tracemalloc slows every allocation, so it never overlaps the timings
+        peaks = []
+        tracemalloc.start()
+        for _ in range(args.memory_samples):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+
+        results[name] = dict(latency_summary(latencies, elapsed), errors=errors,
+                             peak_alloc_kb=round(max(peaks, default=0) / 1024, 1), rss_mb=rss_mb())
+        print_row('client', name, results[name])
+    return results
+
+
+# -------------------- HTTP LOAD --------------------
+def start_server(db_path, pdf_cache, port):
+    env = dict(os.environ, REPORTCARE_DATABASE_URL=f"sqlite:///{db_path}", PYTHONWARNINGS='ignore')
+    code = (f"import app; app.PDF_CACHE_FOLDER = {pdf_cache!r}; "
+            f"app.create_app().run(port={port}, threaded=True, use_reloader=False)")
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup (is the model trained?)")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def http_login(port, email):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', '/login', urllib.parse.urlencode({'email': email, 'password': PASSWORD}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = response.getheader('Set-Cookie', '').split(';')[0]
+    if not cookie:
+        raise RuntimeError("login did not return a session cookie")
+    return cookie
+
+
+def http_client(port, cookie, name, ids, seed, stop_at, latencies, errors):
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while time.perf_counter() < stop_at:
+        method, path, body, content_type = make_request(name, rnd, ids)
+        headers = {'Cookie': cookie}
+        if content_type:
+            headers['Content-Type'] = content_type
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - t0) * 1000)
+        else:
+            errors.append(1)
+    conn.close()
+
+
+def run_http(db_path, ids, args):
+    port = free_port()
+    server = start_server(db_path, tempfile.mkdtemp(prefix='bench-pdf-'), port)
+    results = {}
+    try:
+        cookie = http_login(port, ids['lab_email'])
+        for name in args.endpoints:
+            # warm-up: model load, connections, first renders
+            http_client(port, cookie, name, ids, 'warmup', time.perf_counter() + 1, [], [])
+            latencies, errors = [], []
+            stop_at = time.perf_counter() + args.seconds
+            threads = [threading.Thread(target=http_client,
+                                        args=(port, cookie, name, ids, f"{args.seed}-{name}-{i}",
+                                              stop_at, latencies, errors))
+                       for i in range(args.clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results[name] = dict(latency_summary(latencies, args.seconds), errors=len(errors),
+                                 clients=args.clients, server_rss_mb=rss_mb(server.pid))
+            print_row('http', name, results[name])
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+# -------------------- REPORTING --------------------
+def print_row(mode, name, r):
+    memory = (f"peak alloc {r['peak_alloc_kb']:8.1f} KB   rss {r['rss_mb']:6.1f} MB" if 'peak_alloc_kb' in r
+              else f"server rss {r['server_rss_mb'] or 0:6.1f} MB")
+    print(f"{mode:6} {name:18} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:7.2f}   p95 {r['p95_ms']:7.2f}"
+          f"   p99 {r['p99_ms']:8.2f} ms   errors {r['errors']:4}   {memory}")
+
+
+def compare(results, baseline):
+    print(f"\nChange vs {baseline['meta'].get('git_rev', '?')[:12]} ({baseline['meta'].get('date')}):")
+    for mode in ('client', 'http'):
+        for name, now in results.get(mode, {}).items():
+            before = baseline.get(mode, {}).get(name)
+            if not before:
+                continue
+            deltas = []
+            for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+                if before[key]:
+                    deltas.append(f"{key} {(now[key] - before[key]) / before[key] * 100:+6.1f}%")
+            print(f"{mode:6} {name:18} " + "   ".join(deltas))
+
+
+def git_rev():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--labs', type=int, default=20)
+    parser.add_argument('--patients', type=int, default=20_000)
+    parser.add_argument('--reports', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=200, help="timed test-client requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--memory-samples', type=int, default=20, help="requests traced for peak allocation")
+    parser.add_argument('--http', action='store_true', help="also load-test a real server process")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10, help="HTTP load duration per endpoint")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="earlier --json results to compare against")
+    args = parser.parse_args()
+    args.endpoints = [e for e in args.endpoints.split(',') if e]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    # The app reads its database URL at import time and resolves models/ and static/ from the cwd
+    workdir = tempfile.mkdtemp(prefix='bench-routes-')
+    db_path = os.path.join(workdir, 'bench.db')
+    os.environ['REPORTCARE_DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.chdir(ROOT)
+    import app as app_module
+    app_module.PDF_CACHE_FOLDER = os.path.join(workdir, 'pdf_cache')
+
+    t0 = time.perf_counter()
+    ids = seed(app_module, args)
+    print(f"Seeded {args.labs} labs / {args.patients:,} patients / {args.reports:,} reports "
+          f"in {time.perf_counter() - t0:.1f}s -> {db_path}\n")
+
+    results = {
+        'meta': {
+            'git_rev': git_rev(), 'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'scale': {'labs': args.labs, 'patients': args.patients, 'reports': args.reports,
+                      'lab_patients': len(ids['lab_patients']), 'lab_reports': len(ids['lab_reports'])},
+            'requests': args.requests, 'clients': args.clients if args.http else None,
+            'seconds': args.seconds if args.http else None, 'seed': args.seed,
+        },
+        'client': run_test_client(app_module, ids, args),
+    }
+    if args.http:
+        print()
+        # The server opens its own connections; drop ours so it does not wait on our locks
+        with app_module.app.app_context():
+            app_module.db.engine.dispose()
+        results['http'] = run_http(db_path, ids, args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
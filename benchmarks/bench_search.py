@@ -0,0 +1,114 @@
+"""
+Typeahead latency of the search backends in search.py.
+
+Seeds a throwaway SQLite database with N patients spread over a number of
+labs, installs each backend and times patient and lab lookups for short
+prefixes, the way a search box fires them on every keystroke.
+
+    python benchmarks/bench_search.py --patients 2000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from bench_indexes import BASE_SCHEMA
+import migrations
+from search import BACKENDS
+
+FIRST = ['Aarav', 'Anaya', 'Rohan', 'Priya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Ishaan', 'Meera',
+         'John', 'Maria', 'David', 'Sarah', 'Ahmed', 'Fatima', 'Chen', 'Yuki', 'Lucas', 'Emma']
+LAST = ['Sharma', 'Verma', 'Gupta', 'Singh', 'Patel', 'Reddy', 'Iyer', 'Khan', 'Das', 'Mehta',
+        'Smith', 'Garcia', 'Brown', 'Wilson', 'Ali', 'Wang', 'Tanaka', 'Silva', 'Martin', 'Jones']
+QUERIES = ['a', 'pr', 'meh', 'rohan', 'kav sin', 'sarah jon', 'xyz']
+
+
+def seed(path, args):
+    rnd = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.executescript(BASE_SCHEMA)
+    conn.executemany("INSERT INTO user (id, role, email, password, name) VALUES (?, 'Lab', ?, 'x', ?)",
+                     [(i, f"lab{i}@bench.local", f"{rnd.choice(LAST)} Diagnostics {i}") for i in range(1, args.labs + 1)])
+    batch = 100_000
+    for first in range(0, args.patients, batch):
+        conn.executemany("INSERT INTO patient (lab_id, name, age) VALUES (?, ?, ?)", [
+            (rnd.randint(1, args.labs), f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.randint(1, 99999)}", 40)
+            for _ in range(min(batch, args.patients - first))])
+    conn.commit()
+    conn.close()
+
+
+def check_punctuated_names(engine, backend):
+    """Words after any punctuation (ASCII or not) must be found, and only by the owning lab."""
+    names = {"Rao (Jr.)/Kumar & O'Neil-Das": ['rao', 'jr', 'kumar', 'das'],
+             "Anna\u00a0Smith\u2014Bose": ['anna', 'smith', 'bose'],
+             "x\u2014l2xsecret": ['l2xsecret']}
+    word_queries = ['rao kum', '(Jr.)/Kumar', 'anna smi', 'smith bo']
+    with engine.begin() as conn:
+        ids = {name: conn.execute(text("INSERT INTO patient (lab_id, name, age) VALUES (1, :name, 40)"),
+                                  {'name': name}).lastrowid for name in names}
+    with engine.connect() as conn:
+        for name, queries in names.items():
+            queries = list(queries)
+            if backend.name != 'like':          # like: one substring of the raw name
+                queries += [q for q in word_queries if q.split()[0].lower() in name.lower()]
+            if backend.name == 'fts5' and "'" in name:     # only the word index folds apostrophes
+                queries += ['oneil', "o'neil-d"]
+            for query in queries:
+                if backend.name == 'like' and query.lower() not in name.lower():
+                    continue
+                if ids[name] not in backend.patient_ids(conn, 1, query, limit=1000):
+                    sys.exit(f"[{backend.name}] {query!r} does not find {name!r}")
+                if ids[name] in backend.patient_ids(conn, 2, query, limit=1000):
+                    sys.exit(f"[{backend.name}] {query!r} finds lab 1's {name!r} from lab 2")
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM patient WHERE id IN ({', '.join(map(str, ids.values()))})"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--labs', type=int, default=200)
+    parser.add_argument('--patients', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--backends', default='like,fts5,trigram')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    t0 = time.perf_counter()
+    seed(path, args)
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    print(f"Seeded {args.patients:,} patients / {args.labs} labs in {time.perf_counter() - t0:.1f}s\n")
+
+    for name in args.backends.split(','):
+        backend = BACKENDS[name]()
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            backend.install(conn)
+        print(f"[{name}] index build {time.perf_counter() - t0:.1f}s")
+        check_punctuated_names(engine, backend)
+
+        with engine.connect() as conn:
+            for query in QUERIES:
+                timings, hits = [], 0
+                for _ in range(args.repeat):
+                    lab_id = random.randint(1, args.labs)
+                    t0 = time.perf_counter()
+                    hits += len(backend.patient_ids(conn, lab_id, query)) + len(backend.lab_ids(conn, query))
+                    timings.append((time.perf_counter() - t0) * 1000)
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f"  {query!r:12} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms"
+                      f"   avg hits {hits / args.repeat:.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
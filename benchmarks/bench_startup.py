@@ -0,0 +1,170 @@
+"""
+Startup cost of app.py: working tree vs an older git revision.
+
+For each tree, fresh processes measure the time to `import app`, to serve the
+first request, and to answer the first /api/predict, plus peak RSS and
+whether sklearn got imported. For the working tree it also forks N workers
+from a master, once with the model preloaded (gunicorn preload_app) and once
+loading lazily in every worker, and sums the workers' PSS to show the pages
+they share.
+
+    python benchmarks/bench_startup.py --ref HEAD~1 --repeat 5 --workers 4
+
+Needs a trained model (models/CURRENT or model.npz/model.pkl) in the repository root.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILES = ('models', 'model.pkl', 'model.npz', 'scaler.pkl', 'scaler.npz')
+PANEL = {"mode": "manual", "m_name": "Startup", "m_age": 45, "m_gender": "Female",
+         "glucose": 148, "bp": 72, "skin": 35, "insulin": 0, "bmi": 33.6, "dpf": 0.627, "pregnancies": 2}
+
+
+def checkout(ref):
+    """Export `ref` into a temp dir and copy the trained model files next to it."""
+    dest = tempfile.mkdtemp(prefix='startup-')
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', dest], input=archive, check=True)
+    for name in MODEL_FILES:
+        src = os.path.join(ROOT, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(dest, name), dirs_exist_ok=True)
+        elif os.path.exists(src):
+            shutil.copy2(src, dest)
+    return dest
+
+
+def login(client):
+    client.post('/register', data={'role': 'Lab', 'license_no': 'LAB-START', 'email': f"start{os.getpid()}@bench.local",
+                                   'password': 'x', 'confirm_password': 'x', 'name': 'Startup Lab'})
+
+
+def pss_kb():
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    return 0
+
+
+def child_cold_start():
+    """Runs inside the measured tree: import -> first request -> first prediction."""
+    import resource
+    t0 = time.perf_counter()
+    import app as app_module
+    t_import = time.perf_counter() - t0
+    client = app_module.app.test_client()
+    client.get('/')
+    t_first_request = time.perf_counter() - t0
+    login(client)
+    response = client.post('/api/predict', json=PANEL)
+    t_first_predict = time.perf_counter() - t0
+    print(json.dumps({
+        'import_s': round(t_import, 3),
+        'first_request_s': round(t_first_request, 3),
+        'first_predict_s': round(t_first_predict, 3),
+        'predict_status': response.status_code,
+        'sklearn_imported': 'sklearn' in sys.modules,
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def child_fork(workers, preload):
+    """Master + forked workers, like gunicorn; prints the workers' summed PSS."""
+    import app as app_module
+    app_module.create_app(preload_model=preload)
+    pipes, pids = [], []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            client = app_module.app.test_client()
+            login(client)
+            client.post('/api/predict', json=PANEL)
+            os.write(w, str(pss_kb()).encode())
+            os._exit(0)
+        os.close(w)
+        pipes.append(r)
+        pids.append(pid)
+    total = 0
+    for r, pid in zip(pipes, pids):
+        total += int(os.read(r, 64) or 0)
+        os.close(r)
+        os.waitpid(pid, 0)
+    print(json.dumps({'workers': workers, 'preload': preload, 'workers_pss_mb': round(total / 1024, 1)}))
+
+
+def run_child(tree, args, db_dir):
+    env = dict(os.environ, PYTHONWARNINGS='ignore', PYTHONPATH=tree,
+               REPORTCARE_DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'startup.db')}")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), *args], cwd=tree, env=env,
+                         capture_output=True, text=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(f"child failed in {tree}:\n{out.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def cold_starts(label, tree, repeat):
+    runs = []
+    for _ in range(repeat):
+        db_dir = tempfile.mkdtemp()
+        runs.append(run_child(tree, ['--child', 'cold'], db_dir))
+        shutil.rmtree(db_dir, ignore_errors=True)
+    summary = {key: statistics.median(r[key] for r in runs)
+               for key in ('import_s', 'first_request_s', 'first_predict_s', 'max_rss_mb')}
+    summary['sklearn_imported'] = runs[-1]['sklearn_imported']
+    print(f"{label:8} import {summary['import_s']:6.3f}s   first request {summary['first_request_s']:6.3f}s   "
+          f"first predict {summary['first_predict_s']:6.3f}s   max RSS {summary['max_rss_mb']:6.1f} MB   "
+          f"sklearn imported: {summary['sklearn_imported']}")
+    return summary
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        if sys.argv[2] == 'cold':
+            return child_cold_start()
+        return child_fork(int(sys.argv[3]), sys.argv[4] == '1')
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ref', default='HEAD', help="git revision to compare against (default: HEAD)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4, help="forked workers for the preload test (0 = skip)")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    before_tree = checkout(args.ref)
+    results = {'ref': args.ref}
+    try:
+        results['before'] = cold_starts(args.ref[:8], before_tree, args.repeat)
+        results['after'] = cold_starts('working', ROOT, args.repeat)
+    finally:
+        shutil.rmtree(before_tree, ignore_errors=True)
+    print(f"import speedup {results['before']['import_s'] / results['after']['import_s']:.1f}x, "
+          f"first predict {results['before']['first_predict_s'] / results['after']['first_predict_s']:.1f}x")
+
+    if args.workers and os.path.exists('/proc/self/smaps_rollup') and hasattr(os, 'fork'):
+        for preload in (False, True):
+            db_dir = tempfile.mkdtemp()
+            result = run_child(ROOT, ['--child', 'fork', str(args.workers), '1' if preload else '0'], db_dir)
+            shutil.rmtree(db_dir, ignore_errors=True)
+            results['preload' if preload else 'lazy'] = result
+            print(f"{args.workers} workers, {'preloaded in master' if preload else 'lazy per worker  '}: "
+                  f"summed PSS {result['workers_pss_mb']:7.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
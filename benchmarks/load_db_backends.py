@@ -0,0 +1,261 @@
+"""
+Concurrent mixed-workload load test of the database backends: one SQLite
+file vs pooled PostgreSQL, each with and without read-replica routing.
+
+Every configuration gets the same seeded data (bench_routes.seed()) and the
+app in a subprocess; C client threads, logged in as one lab, pick requests
+from a weighted mix of writes and reads for a fixed time:
+
+    predict            POST /api/predict (existing patient)      -> primary
+    dashboard          GET  /dashboard                           -> replica
+    generated_reports  GET  /my-generated-reports                -> replica
+    global_search      GET  /global-search?q=...                 -> replica
+    verify_process     POST /verify-process                      -> replica
+
+Configurations:
+    sqlite             REPORTCARE_DATABASE_URL=sqlite:///... (WAL)
+    sqlite+replica     a second SQLite file (a copy of the seeded primary) as
+                       REPORTCARE_REPLICA_URL: a stand-in that exercises the
+                       routing, not replication (nothing copies later writes)
+    postgres           --postgres URL, pool sized to the client count
+    postgres+replica   --postgres URL --postgres-replica URL (a hot standby
+                       streaming from the first)
+
+The PostgreSQL databases must be empty: the run seeds them through the app.
+The clients never send the session cookie of their own writes back, so the
+read-your-writes stickiness (REPLICA_STICKY_SECONDS) does not kick in and the
+replica gets every read-only request. Statement counts per engine are read
+back from /metrics.
+
+    python benchmarks/load_db_backends.py --clients 4,16,32 --seconds 10
+    python benchmarks/load_db_backends.py --postgres postgresql+psycopg2://bench@localhost/reportcare_bench \\
+        --postgres-replica postgresql+psycopg2://bench@localhost:5433/reportcare_bench --json db.json
+
+Needs a trained model (python train.py) in the repository root, and a
+PostgreSQL driver (psycopg2 or psycopg) for the postgres configurations.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_routes import http_login, latency_summary, load_rows, make_request, seed  # noqa: E402
+from load_predict_writes import free_port  # noqa: E402
+
+MIX = {'predict': 2, 'dashboard': 2, 'generated_reports': 2, 'global_search': 1, 'verify_process': 1}
+SERVER_ENV = {'REPORTCARE_SQLITE_WAL': '1', 'REPORTCARE_METRICS': '1', 'PYTHONWARNINGS': 'ignore'}
+
+
+# -------------------- SEED --------------------
+def child_seed(url, out_path, labs, patients, reports, rng_seed):
+    """Runs in a subprocess so the app picks up REPORTCARE_DATABASE_URL at import."""
+    os.environ['REPORTCARE_DATABASE_URL'] = url
+    os.environ.pop('REPORTCARE_REPLICA_URL', None)
+    os.chdir(ROOT)
+    import app as app_module
+    app_module.init_db()
+    with app_module.app.app_context():
+        if app_module.db.session.query(app_module.User.id).first() is not None:
+            sys.exit(f"{url} already has data; the benchmark needs an empty database")
+    ids = seed(app_module, SimpleNamespace(labs=labs, patients=patients, reports=reports, seed=rng_seed))
+    ids.pop('panel_rows')
+    with open(out_path, 'w') as f:
+        json.dump(ids, f)
+
+
+def seed_database(url, args):
+    out_path = os.path.join(tempfile.mkdtemp(prefix='bench-db-'), 'ids.json')
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--seed-child', url, out_path,
+                           str(args.labs), str(args.patients), str(args.reports), str(args.seed)],
+                          cwd=ROOT, env=dict(os.environ, PYTHONWARNINGS='ignore'), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"seeding {url} failed:\n{(proc.stderr or proc.stdout)[-2000:]}")
+    with open(out_path) as f:
+        ids = json.load(f)
+    ids['patient_ages'] = {int(k): v for k, v in ids['patient_ages'].items()}
+    ids['panel_rows'] = load_rows()
+    print(f"Seeded {url.split('@')[-1]} in {time.perf_counter() - t0:.1f}s")
+    return ids
+
+
+def copy_sqlite(src, dst):
+    """Consistent copy of a (WAL) SQLite database."""
+    source, target = sqlite3.connect(src), sqlite3.connect(dst)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+# -------------------- LOAD --------------------
+def start_server(env_overrides, port):
+    env = dict(os.environ)
+    env.pop('REPORTCARE_REPLICA_URL', None)
+    env.update(SERVER_ENV, **env_overrides)
+    code = f"import app; app.create_app().run(port={port}, threaded=True, use_reloader=False)"
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup (is the model trained? is the driver installed?)")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def http_client(port, cookie, ids, rng_seed, stop_at, latencies, errors):
+    rnd = random.Random(rng_seed)
+    names, weights = list(MIX), list(MIX.values())
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while time.perf_counter() < stop_at:
+        name = rnd.choices(names, weights)[0]
+        method, path, body, content_type = make_request(name, rnd, ids)
+        headers = {'Cookie': cookie}
+        if content_type:
+            headers['Content-Type'] = content_type
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            ok = False
+        if ok:
+            latencies[name].append((time.perf_counter() - t0) * 1000)
+        else:
+            errors.append(name)
+    conn.close()
+
+
+def routed_statements(port):
+    """{'primary': n, 'replica': n} from /metrics (empty without a replica)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/metrics')
+    text = conn.getresponse().read().decode()
+    conn.close()
+    counts = {}
+    for line in text.splitlines():
+        if line.startswith('reportcare_db_routed_statements_total{'):
+            engine = line.split('engine="', 1)[1].split('"', 1)[0]
+            counts[engine] = int(float(line.rsplit(' ', 1)[1]))
+    return counts
+
+
+def run_config(name, env_overrides, ids, args):
+    port = free_port()
+    server = start_server(env_overrides, port)
+    results = []
+    try:
+        cookie = http_login(port, ids['lab_email'])
+        warm = {n: [] for n in MIX}
+        http_client(port, cookie, ids, 'warmup', time.perf_counter() + 1, warm, [])
+        for clients in args.clients:
+            latencies, errors = {n: [] for n in MIX}, []
+            before = routed_statements(port)
+            stop_at = time.perf_counter() + args.seconds
+            threads = [threading.Thread(target=http_client,
+                                        args=(port, cookie, ids, f"{args.seed}-{clients}-{i}", stop_at,
+                                              latencies, errors))
+                       for i in range(clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            after = routed_statements(port)
+            result = dict(latency_summary([ms for values in latencies.values() for ms in values], args.seconds),
+                          config=name, clients=clients, errors=len(errors),
+                          writes_per_s=round(len(latencies['predict']) / args.seconds, 1),
+                          routed={engine: after[engine] - before.get(engine, 0) for engine in after},
+                          endpoints={n: dict(latency_summary(v, args.seconds), errors=errors.count(n))
+                                     for n, v in latencies.items()})
+            results.append(result)
+            routed = '   '.join(f"{engine} {n}" for engine, n in sorted(result['routed'].items()))
+            print(f"{name:17} {clients:3d} clients {result['throughput_rps']:8.1f} req/s "
+                  f"({result['writes_per_s']:6.1f} writes/s)   p50 {result['p50_ms']:7.2f}   "
+                  f"p99 {result['p99_ms']:8.2f} ms   errors {result['errors']:4}   {routed}")
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--seed-child':
+        url, out_path, labs, patients, reports, rng_seed = sys.argv[2:8]
+        return child_seed(url, out_path, int(labs), int(patients), int(reports), int(rng_seed))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--labs', type=int, default=20)
+    parser.add_argument('--patients', type=int, default=5_000)
+    parser.add_argument('--reports', type=int, default=25_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clients', default='4,16,32', help="comma-separated client counts")
+    parser.add_argument('--seconds', type=float, default=10, help="load duration per client count")
+    parser.add_argument('--postgres', help="SQLAlchemy URL of an empty PostgreSQL database")
+    parser.add_argument('--postgres-replica', help="URL of a hot standby of --postgres")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+    args.clients = [int(c) for c in args.clients.split(',') if c]
+    if args.postgres_replica and not args.postgres:
+        parser.error("--postgres-replica needs --postgres")
+    pool = {'REPORTCARE_DB_POOL_SIZE': str(max(args.clients)), 'REPORTCARE_DB_MAX_OVERFLOW': '0'}
+
+    workdir = tempfile.mkdtemp(prefix='bench-db-')
+    template = os.path.join(workdir, 'seeded.db')
+    ids = seed_database(f"sqlite:///{template}", args)
+    configs = []
+    for name, replica in (('sqlite', False), ('sqlite+replica', True)):
+        # A fresh copy per configuration, so one run's writes don't slow the next
+        primary = os.path.join(workdir, f"{name}.db")
+        copy_sqlite(template, primary)
+        env = {'REPORTCARE_DATABASE_URL': f"sqlite:///{primary}"}
+        if replica:
+            copy_sqlite(template, os.path.join(workdir, 'replica.db'))
+            env['REPORTCARE_REPLICA_URL'] = f"sqlite:///{os.path.join(workdir, 'replica.db')}"
+        configs.append((name, env, ids))
+    if args.postgres:
+        pg_ids = seed_database(args.postgres, args)
+        configs.append(('postgres', dict(pool, REPORTCARE_DATABASE_URL=args.postgres), pg_ids))
+        if args.postgres_replica:
+            time.sleep(2)             # let the standby replay the seed
+            configs.append(('postgres+replica', dict(pool, REPORTCARE_DATABASE_URL=args.postgres,
+                                                     REPORTCARE_REPLICA_URL=args.postgres_replica), pg_ids))
+
+    results = []
+    for name, env, config_ids in configs:
+        results.extend(run_config(name, env, config_ids, args))
+    for clients in args.clients:
+        rows = {r['config']: r['throughput_rps'] for r in results if r['clients'] == clients}
+        base = rows.get('sqlite')
+        if base:
+            print(f"{clients:3d} clients, throughput vs sqlite: "
+                  + '   '.join(f"{name} {rps / base:.2f}x" for name, rps in rows.items() if name != 'sqlite'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
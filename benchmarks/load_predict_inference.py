@@ -0,0 +1,212 @@
+"""
+Concurrent single-prediction load test: per-request inference vs the shared
+inference batch (REPORTCARE_INFERENCE_BATCHING=1).
+
+Two phases, each run with batching off and on:
+
+    inproc   C threads call app.predict_panel() directly: inference only,
+             no HTTP or database, so the batching effect is not diluted
+    http     the app in a subprocess (WAL + group commit, metrics on) and C
+             client threads posting manual-mode /api/predict; the mean batch
+             size and queue wait are read back from /metrics
+
+Every request carries a different panel, so the prediction cache never
+answers instead of the model.
+
+    python benchmarks/load_predict_inference.py --clients 16 --seconds 10
+
+Needs a trained model (python train.py) in the repository root.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_predict_writes import PANEL, free_port, register_lab, start_server  # noqa: E402
+
+CONFIGS = {
+    'per-request': {'REPORTCARE_INFERENCE_BATCHING': '0'},
+    'batched': {'REPORTCARE_INFERENCE_BATCHING': '1'},
+}
+SERVER_ENV = {'REPORTCARE_SQLITE_WAL': '1', 'REPORTCARE_GROUP_COMMIT': '1', 'REPORTCARE_METRICS': '1'}
+
+
+def random_panel(rng):
+    return dict(PANEL, glucose=rng.randint(60, 200), bp=rng.randint(40, 110), skin=rng.randint(0, 60),
+                insulin=rng.randint(0, 400), bmi=round(rng.uniform(18, 50), 1),
+                dpf=round(rng.uniform(0.05, 2.0), 3), m_age=rng.randint(21, 80))
+
+
+def summarize(name, phase, latencies, errors, seconds, clients):
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else 0.0
+    return {
+        'config': name,
+        'phase': phase,
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies), 3) if latencies else 0.0,
+        'p99_ms': round(p99, 3),
+    }
+
+
+# -------------------- IN-PROCESS --------------------
+def child_inproc(clients, seconds):
+    """Runs in a subprocess so REPORTCARE_INFERENCE_BATCHING is read at import."""
+    import app as app_module
+    rng = random.Random(0)
+    app_module.predict_panel(app_module.panel_features(random_panel(rng), 45))   # model load
+    latencies, errors = [], []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        mine = []
+        while time.perf_counter() < stop_at:
+            panel = random_panel(rng)
+            t0 = time.perf_counter()
+            try:
+                app_module.predict_panel(app_module.panel_features(panel, panel['m_age']))
+                mine.append((time.perf_counter() - t0) * 1000)
+            except Exception:
+                errors.append(1)
+        latencies.extend(mine)
+
+    stop_at = time.perf_counter() + seconds
+    threads = [threading.Thread(target=worker, args=(i + 1,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result = {'latencies': latencies, 'errors': len(errors)}
+    result['batcher'] = app_module.inference_batcher.stats()
+    print(json.dumps(result))
+
+
+def run_inproc(name, args):
+    env = dict(os.environ, PYTHONWARNINGS='ignore', **CONFIGS[name],
+               REPORTCARE_DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'inproc.db')}")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(args.clients), str(args.seconds)],
+                         cwd=ROOT, env=env, capture_output=True, text=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(f"in-process run failed:\n{out.stderr[-2000:]}")
+    data = json.loads(lines[-1])
+    result = summarize(name, 'inproc', data['latencies'], data['errors'], args.seconds, args.clients)
+    if name == 'batched':
+        result['avg_batch_size'] = data['batcher']['avg_batch_size']
+    return result
+
+
+# -------------------- HTTP --------------------
+def client(port, cookie, stop_at, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json', 'Cookie': cookie}
+    while time.perf_counter() < stop_at:
+        body = json.dumps(random_panel(rng))
+        t0 = time.perf_counter()
+        try:
+            conn.request('POST', '/api/predict', body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - t0) * 1000)
+        else:
+            errors.append(1)
+    conn.close()
+
+
+def batcher_metrics(port):
+    """Mean batch size and queue wait of the inference batcher, from /metrics."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/metrics')
+    text = conn.getresponse().read().decode()
+    conn.close()
+    values = {}
+    for line in text.splitlines():
+        if 'batcher="inference"' in line and ('_sum' in line or '_count' in line):
+            name = line.split('{')[0].replace('reportcare_', '')
+            values[name] = float(line.rsplit(' ', 1)[1])
+    size_n = values.get('micro_batch_size_count', 0)
+    wait_n = values.get('micro_batch_queue_wait_seconds_count', 0)
+    return {
+        'avg_batch_size': round(values.get('micro_batch_size_sum', 0) / size_n, 2) if size_n else 0.0,
+        'avg_queue_wait_ms': round(values.get('micro_batch_queue_wait_seconds_sum', 0) / wait_n * 1000, 3)
+        if wait_n else 0.0,
+    }
+
+
+def run_http(name, args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    port = free_port()
+    server = start_server(dict(SERVER_ENV, **CONFIGS[name]), db_path, port)
+    try:
+        cookie = register_lab(port)
+        client(port, cookie, time.perf_counter() + 1, 0, [], [])     # warm-up: model load, connections
+
+        latencies, errors = [], []
+        stop_at = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=client, args=(port, cookie, stop_at, i + 1, latencies, errors))
+                   for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        result = summarize(name, 'http', latencies, len(errors), args.seconds, args.clients)
+        if name == 'batched':
+            result.update(batcher_metrics(port))
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        return child_inproc(int(sys.argv[2]), float(sys.argv[3]))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--phases', default='inproc,http')
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for phase in args.phases.split(','):
+        runner = run_inproc if phase == 'inproc' else run_http
+        by_config = {}
+        for name in CONFIGS:
+            result = by_config[name] = runner(name, args)
+            results.append(result)
+            extra = (f"   batch {result['avg_batch_size']:5.2f}" if 'avg_batch_size' in result else '')
+            extra += (f"   queue wait {result['avg_queue_wait_ms']:6.3f} ms" if 'avg_queue_wait_ms' in result else '')
+            print(f"{phase:6} {name:12} {result['throughput_rps']:9.1f} req/s   p50 {result['p50_ms']:7.2f} ms"
+                  f"   p99 {result['p99_ms']:8.2f} ms   errors {result['errors']}{extra}")
+        base = by_config['per-request']['throughput_rps']
+        if base:
+            print(f"{phase:6} batched / per-request throughput: {by_config['batched']['throughput_rps'] / base:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
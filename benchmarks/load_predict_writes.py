@@ -0,0 +1,160 @@
+"""
+Concurrent write load test for POST /api/predict.
+
+Starts the app on a throwaway SQLite database once per configuration, logs in
+as a lab and has C client threads fire manual-mode predictions (new patient +
+report + analysis each) for a fixed time, then prints throughput, latency and
+how many requests failed (e.g. "database is locked").
+
+Configurations:
+    rollback   old rollback journal, one commit per request
+    wal        WAL journal + synchronous=NORMAL, one commit per request
+    wal-group  WAL + group commit (REPORTCARE_GROUP_COMMIT=1)
+
+    python benchmarks/load_predict_writes.py --clients 16 --seconds 20
+
+Needs a trained model (python train.py) in the repository root.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    'rollback': {'REPORTCARE_SQLITE_WAL': '0', 'REPORTCARE_GROUP_COMMIT': '0'},
+    'wal': {'REPORTCARE_SQLITE_WAL': '1', 'REPORTCARE_GROUP_COMMIT': '0'},
+    'wal-group': {'REPORTCARE_SQLITE_WAL': '1', 'REPORTCARE_GROUP_COMMIT': '1'},
+}
+
+PANEL = {"mode": "manual", "m_name": "Load Test", "m_age": 45, "m_gender": "Female",
+         "glucose": 148, "bp": 72, "skin": 35, "insulin": 0, "bmi": 33.6, "dpf": 0.627, "pregnancies": 2}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(env_overrides, db_path, port):
+    env = dict(os.environ, REPORTCARE_DATABASE_URL=f"sqlite:///{db_path}", **env_overrides)
+    code = f"from app import app; app.run(port={port}, threaded=True, use_reloader=False)"
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup (is the model trained?)")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def register_lab(port):
+    """Register a lab account and return its session cookie."""
+    form = urllib.parse.urlencode({
+        'role': 'Lab', 'license_no': 'LAB-LOAD', 'email': f"load{time.time_ns()}@bench.local",
+        'password': 'x', 'confirm_password': 'x', 'name': 'Load Test Lab'})
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', '/register', form, {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie', '').split(';')[0]
+    conn.close()
+    if not cookie:
+        raise RuntimeError("registration did not return a session cookie")
+    return cookie
+
+
+def client(port, cookie, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json', 'Cookie': cookie}
+    body = json.dumps(PANEL)
+    while time.perf_counter() < stop_at:
+        t0 = time.perf_counter()
+        try:
+            conn.request('POST', '/api/predict', body, headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - t0) * 1000)
+        else:
+            errors.append(1)
+    conn.close()
+
+
+def run(name, args):
+    db_path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    port = free_port()
+    server = start_server(CONFIGS[name], db_path, port)
+    try:
+        cookie = register_lab(port)
+        # warm-up: model load, first connections
+        client(port, cookie, time.perf_counter() + 1, [], [])
+
+        latencies, errors = [], []
+        stop_at = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=client, args=(port, cookie, stop_at, latencies, errors))
+                   for _ in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else 0.0
+    return {
+        'config': name,
+        'clients': args.clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else 0.0,
+        'p99_ms': round(p99, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--configs', default=','.join(CONFIGS))
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.configs.split(','):
+        result = run(name, args)
+        results.append(result)
+        print(f"{name:10} {result['throughput_rps']:8.1f} req/s   p50 {result['p50_ms']:7.2f} ms"
+              f"   p99 {result['p99_ms']:8.2f} ms   errors {result['errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
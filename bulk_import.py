@@ -0,0 +1,165 @@
+"""
+Streaming reader for bulk lab-result imports (CSV or NDJSON).
+
+Files are read line by line from a byte offset and handed out in chunks of
+parsed rows, so memory stays bounded by the chunk size whatever the file size.
+Each chunk carries the byte offset just past its last row; the importer
+commits that offset together with the chunk's rows, which makes a crashed
+import resumable exactly where it stopped.
+
+CSV files use the diabetes.csv layout (Pregnancies, Glucose, BloodPressure,
+SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age[, Outcome]) plus
+optional Name, Gender, Phone and Remarks columns. NDJSON objects may use
+either those names or the /api/predict field names.
+"""
+import csv
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Model feature order (same as panel_features() in app.py)
+FEATURES = ('pregnancies', 'glucose', 'bp', 'skin', 'insulin', 'bmi', 'dpf', 'age')
+DEFAULTS = {'pregnancies': 0, 'skin': 20, 'dpf': 0.47}
+
+ALIASES = {
+    'pregnancies': 'pregnancies',
+    'glucose': 'glucose',
+    'bloodpressure': 'bp', 'bp': 'bp',
+    'skinthickness': 'skin', 'skin': 'skin',
+    'insulin': 'insulin',
+    'bmi': 'bmi',
+    'diabetespedigreefunction': 'dpf', 'dpf': 'dpf',
+    'age': 'age', 'm_age': 'age',
+    'name': 'name', 'm_name': 'name',
+    'gender': 'gender', 'm_gender': 'gender',
+    'phone': 'phone',
+    'remarks': 'remarks',
+}
+
+# Text fields and the longest value their column takes (None = unlimited)
+TEXT_FIELDS = {'name': 100, 'gender': 10, 'phone': 20, 'remarks': None}
+
+MAX_ERRORS_KEPT = 20
+
+# rows: list of dicts (normalized keys), features: float array (len(rows), 8),
+# line_numbers: source line of each row, end_offset / end_line: where the chunk
+# stops (pass them back to read_chunks to resume), errors: ["line N: message", ...]
+# for the rows that were skipped
+Chunk = namedtuple('Chunk', 'rows features line_numbers end_offset end_line skipped errors')
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return None
+
+
+def text_value(field, value):
+    """A text field as str; numbers are converted, anything else (lists, objects, booleans) is an error."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError(f"{field} must be text, got {type(value).__name__}")
+    value = str(value).strip()
+    limit = TEXT_FIELDS[field]
+    if limit is not None and len(value) > limit:
+        raise ValueError(f"{field} is longer than {limit} characters")
+    return value
+
+
+def normalize(record):
+    """Map source column names to our field names; unknown columns are dropped."""
+    row = {}
+    for key, value in record.items():
+        field = ALIASES.get(str(key).strip().lower())
+        if field in TEXT_FIELDS and value is not None:
+            value = text_value(field, value)
+        if field and value not in (None, ''):
+            row[field] = value
+    return row
+
+
+def features_of(row):
+    values = [float(row[f]) if f in row else float(DEFAULTS[f]) for f in FEATURES]
+    if not all(map(math.isfinite, values)):
+        raise ValueError("non-finite feature value")
+    return values
+
+
+class _LineReader:
+    """Decoded lines of a binary file, tracking the byte offset and number of the last line read."""
+
+    def __init__(self, f, offset, line):
+        self.f = f
+        self.offset = offset
+        self.line = line
+
+    def __iter__(self):
+        for raw in self.f:
+            self.offset += len(raw)
+            self.line += 1
+            yield raw.decode('utf-8-sig' if self.line == 1 else 'utf-8')
+
+
+def _csv_records(f, offset, line):
+    header_lines = _LineReader(f, 0, 0)
+    header = next(csv.reader(header_lines), None)
+    if header is None:
+        return header_lines, iter(())
+    if offset < header_lines.offset:
+        offset, line = header_lines.offset, header_lines.line
+    f.seek(offset)
+    lines = _LineReader(f, offset, line)
+    return lines, (dict(zip(header, values)) for values in csv.reader(lines) if any(values))
+
+
+def _ndjson_records(f, offset, line):
+    f.seek(offset)
+    lines = _LineReader(f, offset, line)
+
+    def parse():
+        for text in lines:
+            if not text.strip():
+                continue
+            try:
+                yield json.loads(text)
+            except ValueError as e:
+                yield e
+    return lines, parse()
+
+
+def read_chunks(path, fmt, offset=0, line=0, chunk_size=5000):
+    """
+    Yield Chunks of up to chunk_size valid rows, starting after byte offset
+    `offset`, which is the end of line number `line` (0, 0 = start of file).
+    """
+    with open(path, 'rb') as f:
+        reader = _csv_records if fmt == 'csv' else _ndjson_records
+        lines, records = reader(f, offset, line)
+        rows, features, line_numbers, errors = [], [], [], []
+        skipped = 0
+        for record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                row = normalize(record)
+                values = features_of(row)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                skipped += 1
+                if len(errors) < MAX_ERRORS_KEPT:
+                    errors.append(f"line {lines.line}: {e!r}")
+                continue
+            rows.append(row)
+            features.append(values)
+            line_numbers.append(lines.line)
+            if len(rows) >= chunk_size:
+                yield Chunk(rows, np.array(features, dtype=float), line_numbers,
+                            lines.offset, lines.line, skipped, errors)
+                rows, features, line_numbers, errors = [], [], [], []
+                skipped = 0
+        if rows or skipped:
+            yield Chunk(rows, np.array(features, dtype=float).reshape(-1, len(FEATURES)), line_numbers,
+                        lines.offset, lines.line, skipped, errors)
@@ -0,0 +1,236 @@
+"""
+Compact inference engine for the ExtraTreesClassifier produced by train.py.
+
+The 1000 fitted trees are flattened into a handful of contiguous NumPy arrays
+(feature, threshold, children, leaf value) and saved as `model.npz`. Loading
+that file needs only NumPy, and evaluation walks every tree at once, one tree
+level per step, instead of going through sklearn's per-estimator overhead.
+Probabilities are bit-identical to the sklearn forest's predict_proba.
+
+That makes single panels fast; for thousands of rows sklearn's own Cython
+traversal is still quicker, which is why bulk imports score with model.pkl.
+
+Per-feature contributions (path attribution, as in treeinterpreter): every
+step from a node to its child changes the predicted probability by
+value[child] - value[node], and that change is credited to the feature the
+node splits on. Summed along each root-to-leaf path, this gives one vector
+per leaf. So a row's contributions are the mean of its leaves' vectors over
+the trees: the leaves apply() already found, gathered from a second table.
+bias + contributions.sum() equals the predicted probability.
+
+Export an existing pickle with:  python forest.py model.pkl model.npz [scaler.pkl scaler.npz]
+"""
+import hashlib
+import sys
+import numpy as np
+
+COMPILED_MODEL_PATH = 'model.npz'
+COMPILED_SCALER_PATH = 'scaler.npz'
+# Rows walked together; keeps the per-(row, tree) work arrays cache-sized
+APPLY_BLOCK_ROWS = 512
+
+
+class CompiledForest:
+    """Drop-in replacement for the fitted forest's predict / predict_proba."""
+
+    def __init__(self, feature, threshold, children, value, roots, classes, max_depth):
+        self.feature = feature        # (n_nodes,) split feature, 0 for leaves
+        self.threshold = threshold    # (n_nodes,) split threshold, +inf for leaves
+        self.children = children      # (2, n_nodes) [left, right]; leaves point to themselves
+        self.value = value            # (n_nodes, n_classes) normalized class probabilities
+        self.roots = roots            # (n_trees,) root node of every tree
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(feature.max()) + 1 if len(feature) else 0
+        self._contributions = None    # (leaf_slot, leaf_contrib, bias), built on first use
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten every fitted tree of a sklearn forest into shared arrays."""
+        trees = [est.tree_ for est in model.estimators_]
+        n_classes = len(model.classes_)
+        total = sum(t.node_count for t in trees)
+
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.full(total, np.inf, dtype=np.float64)
+        children = np.empty((2, total), dtype=np.int32)
+        value = np.empty((total, n_classes), dtype=np.float64)
+        roots = np.empty(len(trees), dtype=np.int32)
+
+        offset = 0
+        for i, tree in enumerate(trees):
+            n = tree.node_count
+            idx = np.arange(offset, offset + n, dtype=np.int32)
+            is_split = tree.children_left != -1
+
+            feature[offset:offset + n][is_split] = tree.feature[is_split]
+            threshold[offset:offset + n][is_split] = tree.threshold[is_split]
+            children[0, offset:offset + n] = np.where(is_split, tree.children_left + offset, idx)
+            children[1, offset:offset + n] = np.where(is_split, tree.children_right + offset, idx)
+
+            # tree_.value already holds class fractions, which is exactly what
+            # DecisionTreeClassifier.predict_proba returns for a leaf
+            value[offset:offset + n] = tree.value[:, 0, :n_classes]
+
+            roots[i] = offset
+            offset += n
+
+        max_depth = max(t.max_depth for t in trees)
+        return cls(feature, threshold, children, value, roots, np.asarray(model.classes_), max_depth)
+
+    def save(self, path=COMPILED_MODEL_PATH):
+        np.savez(path, feature=self.feature, threshold=self.threshold, children=self.children,
+                 value=self.value, roots=self.roots, classes=self.classes_,
+                 max_depth=np.array(self.max_depth))
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature'], data['threshold'], data['children'], data['value'],
+                       data['roots'], data['classes'], data['max_depth'])
+
+    def fingerprint(self):
+        """sha256 of the tree arrays: equal for identical forests, whatever file they were saved in."""
+        digest = hashlib.sha256()
+        for array in (self.feature, self.threshold, self.children, self.value, self.roots, self.classes_):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def apply(self, X):
+        """Leaf node index of every (row, tree) pair."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) <= APPLY_BLOCK_ROWS:
+            return self._apply_block(X)
+        return np.vstack([self._apply_block(X[i:i + APPLY_BLOCK_ROWS])
+                          for i in range(0, len(X), APPLY_BLOCK_ROWS)])
+
+    def _apply_block(self, X):
+        n_rows, n_features = X.shape
+        n_trees, n_nodes = len(self.roots), len(self.feature)
+        flat_x = X.ravel()
+        flat_children = self.children.ravel()
+
+        # One slot per (row, tree); slots that reached a leaf drop out of the loop
+        leaves = np.tile(self.roots.astype(np.intp), n_rows)
+        active = np.arange(leaves.size)
+        nodes = leaves.copy()
+        x_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        while nodes.size:
+            go_right = flat_x.take(x_offset + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nxt = flat_children.take(nodes + go_right * n_nodes)
+            leaves[active] = nxt
+            moved = nxt != nodes
+            active, nodes, x_offset = active[moved], nxt[moved], x_offset[moved]
+        return leaves.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        return self._proba(self.apply(X))
+
+    def _proba(self, leaves):
+        leaf_values = self.value[leaves]
+        # Trees are summed one after another (cumsum is sequential), exactly
+        # like the forest's own accumulation, so the result is bit-identical.
+        proba = np.cumsum(leaf_values, axis=1)[:, -1]
+        proba /= len(self.roots)
+        return proba
+
+    def contribution_index(self):
+        """
+        (leaf_slot, leaf_contrib, bias) for the last class (classes_[-1]):
+        leaf_slot maps a node to its row in leaf_contrib (n_leaves, n_features,
+        float32), bias is the forest's mean root value. Built once, ~1 s and
+        4 bytes x n_features per leaf for the 1000-tree model.
+        """
+        if self._contributions is None:
+            n_nodes = len(self.feature)
+            positive = self.value[:, -1]
+            is_leaf = self.children[0] == np.arange(n_nodes)
+            path = np.zeros((n_nodes, self.n_features_in_), dtype=np.float32)
+            frontier = self.roots
+            while frontier.size:      # one tree level of every tree per step
+                split = frontier[~is_leaf[frontier]]
+                for side in (0, 1):
+                    child = self.children[side, split]
+                    path[child] = path[split]
+                    path[child, self.feature[split]] += positive[child] - positive[split]
+                frontier = self.children[:, split].ravel()
+            leaves = np.flatnonzero(is_leaf)
+            leaf_slot = np.full(n_nodes, -1, dtype=np.int32)
+            leaf_slot[leaves] = np.arange(len(leaves), dtype=np.int32)
+            self._contributions = (leaf_slot, path[leaves], float(positive[self.roots].mean()))
+        return self._contributions
+
+    def predict_proba_contributions(self, X):
+        """(proba, contributions (n_rows, n_features), bias) from a single traversal."""
+        leaf_slot, leaf_contrib, bias = self.contribution_index()
+        leaves = self.apply(X)
+        # einsum sums over the trees ~4x faster than .sum(axis=1) on the gathered (rows, trees, features) block
+        contributions = np.einsum('rtf->rf', leaf_contrib.take(leaf_slot.take(leaves), axis=0)).astype(np.float64)
+        contributions /= len(self.roots)
+        return self._proba(leaves), contributions, bias
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class CompiledScaler:
+    """
+    MinMaxScaler.transform() as plain NumPy (X * scale_ + min_, the same two
+    in-place operations, so bit-identical). Loading it does not import sklearn,
+    which is most of the app's startup time.
+    """
+
+    def __init__(self, scale, min_):
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        return cls(scaler.scale_, scaler.min_)
+
+    def save(self, path=COMPILED_SCALER_PATH):
+        np.savez(path, scale=self.scale_, min=self.min_)
+
+    @classmethod
+    def load(cls, path=COMPILED_SCALER_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['scale'], data['min'])
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X *= self.scale_
+        X += self.min_
+        return X
+
+
+def export_model(model, path=COMPILED_MODEL_PATH):
+    forest = CompiledForest.from_sklearn(model)
+    forest.save(path)
+    return forest
+
+
+if __name__ == '__main__':
+    import os
+    import pickle
+
+    src = sys.argv[1] if len(sys.argv) > 1 else 'model.pkl'
+    dest = sys.argv[2] if len(sys.argv) > 2 else COMPILED_MODEL_PATH
+    with open(src, 'rb') as f:
+        forest = export_model(pickle.load(f), dest)
+    print(f"Exported {forest.n_estimators} trees / {forest.node_count} nodes to {dest}")
+
+    scaler_src = sys.argv[3] if len(sys.argv) > 3 else 'scaler.pkl'
+    scaler_dest = sys.argv[4] if len(sys.argv) > 4 else COMPILED_SCALER_PATH
+    if os.path.exists(scaler_src):
+        with open(scaler_src, 'rb') as f:
+            CompiledScaler.from_sklearn(pickle.load(f)).save(scaler_dest)
+        print(f"Exported scaler to {scaler_dest}")
@@ -0,0 +1,18 @@
+"""
+gunicorn settings:  gunicorn -c gunicorn.conf.py
+
+The master imports the app, sets up the database and loads the model once
+(preload_app), then forks the workers, which share the model's arrays
+copy-on-write instead of each holding a private copy. Set
+REPORTCARE_PRELOAD_MODEL=0 to have every worker load the model lazily on its
+first prediction instead.
+"""
+import os
+
+os.environ.setdefault('REPORTCARE_PRELOAD_MODEL', '1')
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('REPORTCARE_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('REPORTCARE_THREADS', '4'))
+preload_app = os.environ['REPORTCARE_PRELOAD_MODEL'] == '1'
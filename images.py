@@ -0,0 +1,220 @@
+"""
+Upload processing for profile photos and lab signatures.
+
+An upload is validated (size, real image format, dimensions) and stored
+under the SHA-256 of its bytes, so the same picture uploaded twice is one
+file. The pre-sized variants are made in a background thread pool after the
+request has returned:
+
+    <hash>.<ext>          original, kept so the variants can be regenerated
+    <hash>_thumb.<ext>    small copy for the pages (avatars, signature previews)
+    <hash>_pdf.<ext>      print-sized copy embedded in report PDFs
+
+Photos are re-encoded as JPEG (EXIF orientation applied, alpha flattened onto
+white); signatures stay PNG so a transparent background stays transparent.
+Files stored before this module (time-prefixed names) get their variants the
+first time a page or PDF asks for them.
+
+This module must not import app.py: report_pdf.py (and so the export worker
+processes) uses it to find the PDF variant of a signature.
+"""
+import hashlib
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+UPLOAD_BASE = os.path.join('static', 'uploads')
+FOLDERS = {
+    'profile': os.path.join(UPLOAD_BASE, 'profile_pictures'),
+    'signature': os.path.join(UPLOAD_BASE, 'signatures'),
+}
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+MAX_DIMENSION = 8000                  # px per side; bigger is a decompression bomb or a scan nobody needs
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif', 'BMP': 'bmp'}
+
+# kind -> variant -> (max width, max height); images are only ever shrunk, aspect ratio kept
+VARIANTS = {
+    'profile': {'thumb': (320, 320), 'pdf': (600, 600)},      # avatars show at <= 160 px (2x for HiDPI)
+    'signature': {'thumb': (400, 160), 'pdf': (600, 240)},    # PDF prints it 40 mm wide, ~380 dpi
+}
+OUTPUT = {'profile': ('JPEG', 'jpg'), 'signature': ('PNG', 'png')}
+JPEG_QUALITY = 85
+IMAGE_WORKERS = 2
+
+uploads_total = metrics.counter('image_uploads_total', "Image uploads by kind and outcome.", ('kind', 'result'))
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _open(data):
+    from PIL import Image
+    return Image.open(io.BytesIO(data))
+
+
+def validate(data):
+    """Return the file extension for an acceptable image, else raise InvalidImage."""
+    from PIL import Image, UnidentifiedImageError
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InvalidImage(f"Image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+    try:
+        img = _open(data)
+        fmt, (w, h) = img.format, img.size
+        if fmt not in ALLOWED_FORMATS:
+            raise InvalidImage("Please upload a JPEG, PNG, WebP, GIF or BMP image.")
+        if w > MAX_DIMENSION or h > MAX_DIMENSION:
+            raise InvalidImage(f"Image is larger than {MAX_DIMENSION} x {MAX_DIMENSION} pixels.")
+        img.verify()                  # checks the file structure without decoding every pixel
+    except InvalidImage:
+        raise
+    except Image.DecompressionBombError:
+        # Image.open refuses more than 2x MAX_IMAGE_PIXELS before we ever see the size
+        raise InvalidImage(f"Image is larger than {MAX_DIMENSION} x {MAX_DIMENSION} pixels.")
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise InvalidImage("The uploaded file is not a valid image.")
+    return ALLOWED_FORMATS[fmt]
+
+
+def write_atomic(path, data):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save_upload(file, kind):
+    """
+    Validate and store an uploaded FileStorage; return the stored file name,
+    or None when nothing was uploaded. Raises InvalidImage.
+    """
+    if not file or file.filename == '':
+        return None
+    data = file.read(MAX_UPLOAD_BYTES + 1)
+    try:
+        ext = validate(data)
+    except InvalidImage:
+        uploads_total.inc(kind, 'invalid')
+        raise
+    name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    path = os.path.join(FOLDERS[kind], name)
+    if os.path.exists(path):
+        uploads_total.inc(kind, 'duplicate')
+    else:
+        write_atomic(path, data)
+        uploads_total.inc(kind, 'new')
+    schedule(kind, name)
+    return name
+
+
+# -------------------- VARIANTS --------------------
+def variant_name(kind, name, variant):
+    return f"{os.path.splitext(name)[0]}_{variant}.{OUTPUT[kind][1]}"
+
+
+def render_variant(img, kind, size):
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(img)
+    fmt = OUTPUT[kind][0]
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+    if fmt == 'JPEG' and has_alpha:
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.getchannel('A'))
+        img = background
+    elif img.mode not in ('RGB', 'L') or has_alpha:
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    img.thumbnail(size, Image.LANCZOS)
+    if fmt == 'JPEG':
+        options = {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}
+    else:
+        options = {'optimize': True}
+    out = io.BytesIO()
+    img.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def process(kind, name):
+    """Write every missing variant of an original; returns the variants written."""
+    src = os.path.join(FOLDERS[kind], name)
+    with open(src, 'rb') as f:
+        data = f.read()
+    written = []
+    with metrics.span('image.process'):
+        for variant, size in VARIANTS[kind].items():
+            path = os.path.join(FOLDERS[kind], variant_name(kind, name, variant))
+            if os.path.exists(path):
+                continue
+            img = _open(data)
+            img.load()
+            write_atomic(path, render_variant(img, kind, size))
+            written.append(variant)
+    return written
+
+
+_pool = None
+_pending = set()
+_failed = set()                       # originals Pillow can't read: serve them as they are, don't retry
+_lock = threading.Lock()
+
+
+def _run(kind, name):
+    try:
+        process(kind, name)
+    except Exception:
+        with _lock:
+            _failed.add((kind, name))
+    finally:
+        with _lock:
+            _pending.discard((kind, name))
+
+
+def schedule(kind, name):
+    """Queue variant processing for an original (no-op if it is queued already or has failed)."""
+    global _pool
+    with _lock:
+        if (kind, name) in _pending or (kind, name) in _failed:
+            return
+        _pending.add((kind, name))
+        if _pool is None:
+            # Pillow drops the GIL while resizing and encoding, so threads are enough here
+            _pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='images')
+    _pool.submit(_run, kind, name)
+
+
+def variant_or_original(kind, name, variant):
+    """
+    File name to serve for a page: the variant if it has been written, else the
+    original (and the variant gets queued). Never blocks the request.
+    """
+    if not name:
+        return name
+    vname = variant_name(kind, name, variant)
+    if os.path.exists(os.path.join(FOLDERS[kind], vname)):
+        return vname
+    if os.path.exists(os.path.join(FOLDERS[kind], name)):
+        schedule(kind, name)
+    return name
+
+
+def variant_path(kind, name, variant):
+    """
+    Path of a variant for rendering (PDFs), written synchronously when it is
+    missing so the output does not depend on the background pool's progress.
+    Falls back to the original if it cannot be processed; None if there is no file.
+    """
+    src = os.path.join(FOLDERS[kind], name)
+    path = os.path.join(FOLDERS[kind], variant_name(kind, name, variant))
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(src):
+        return None
+    try:
+        process(kind, name)
+    except Exception:
+        return src
+    return path
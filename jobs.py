@@ -0,0 +1,81 @@
+"""
+Background job worker with no external broker.
+
+Jobs are rows in a SQLite table (ExportJob in app.py). A JobWorker thread
+claims queued rows one at a time and runs them; CPU-heavy work such as PDF
+rendering is fanned out to a process pool, so it neither blocks the Flask
+request threads nor fights them for the GIL. The pool defaults to one process
+per core but one, leaving a core for the web server's request threads.
+
+The worker runs inside the web process (started on the first submitted job)
+or on its own with:  flask --app app export-worker
+"""
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+
+class JobWorker:
+    def __init__(self, claim_next, run_job, fail_job, max_workers=None, poll_interval=5.0):
+        self.claim_next = claim_next      # () -> job id or None
+        self.run_job = run_job            # (job_id, pool) -> None
+        self.fail_job = fail_job          # (job_id, error text) -> None
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            # spawn, not fork: forking a threaded web server process is unsafe
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run_forever, name='job-worker', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Start the worker if needed and tell it a new job is waiting."""
+        self.start()
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def run_pending(self):
+        """Run queued jobs until none are left. Returns how many ran."""
+        count = 0
+        while not self._stop.is_set():
+            job_id = self.claim_next()
+            if job_id is None:
+                break
+            try:
+                self.run_job(job_id, self.pool)
+            except Exception:
+                self.fail_job(job_id, traceback.format_exc(limit=5))
+            count += 1
+        return count
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                traceback.print_exc()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
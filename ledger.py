@@ -0,0 +1,117 @@
+"""
+Report digests and the Merkle-batched verification ledger.
+
+A report's digest is SHA-256 over its canonical content (the printed lab
+values, result and patient details, serialized as sorted compact JSON). The
+digest is printed on the PDF and stored next to the report. Pending digests
+are sealed periodically into ledger batches: a batch stores the Merkle root
+of its digests (in leaf order) plus a chain hash over the previous batch's
+chain hash and this root, so changing any sealed digest or batch breaks every
+later chain hash. An inclusion proof is the log2(batch size) sibling hashes
+from the digest's leaf up to the root.
+
+Leaves and inner nodes are hashed with different prefixes (0x00 / 0x01, as in
+RFC 6962) so an inner node can never pass for a leaf. An odd node at the end
+of a level is carried up unchanged.
+
+This module must not import app.py: report_pdf.py (and so the export worker
+processes) uses it to print the digest.
+"""
+import hashlib
+import json
+
+DIGEST_VERSION = 1                # bump if canonical_content() changes; old digests stay verifiable by stored value
+PDF_DIGEST_MARKER = 'reportcare-sha256:'   # written into the PDF keywords, found again in uploaded files
+GENESIS_CHAIN = '0' * 64
+
+REPORT_FIELDS = (('id', int), ('patient_id', int), ('date', 'datetime'), ('prediction_result', str),
+                 ('accuracy', str), ('risk_score', float), ('glucose', float), ('bp', float),
+                 ('insulin', float), ('bmi', float), ('pregnancies', int), ('skin', float), ('dpf', float),
+                 ('remarks', str))
+PATIENT_FIELDS = (('name', str), ('age', int), ('gender', str), ('lab_id', int))
+
+
+def _canonical(value, kind):
+    if value is None:
+        return None
+    if kind == 'datetime':
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return kind(value)
+
+
+def canonical_content(report, patient):
+    """Bytes that the digest covers. Accepts ORM objects or anything with the same attributes."""
+    content = {'v': DIGEST_VERSION}
+    content.update({name: _canonical(getattr(report, name, None), kind) for name, kind in REPORT_FIELDS})
+    content['patient'] = {name: _canonical(getattr(patient, name, None), kind)
+                          for name, kind in PATIENT_FIELDS} if patient is not None else None
+    return json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def report_digest(report, patient):
+    return hashlib.sha256(canonical_content(report, patient)).hexdigest()
+
+
+def is_digest(value):
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+
+def find_pdf_digest(data):
+    """The digest embedded in a ReportCare PDF's keywords, or None."""
+    start = data.find(PDF_DIGEST_MARKER.encode())
+    if start < 0:
+        return None
+    start += len(PDF_DIGEST_MARKER)
+    digest = data[start:start + 64].decode('ascii', 'replace')
+    return digest if is_digest(digest) else None
+
+
+# -------------------- MERKLE TREE --------------------
+def leaf_hash(digest):
+    return hashlib.sha256(b'\x00' + bytes.fromhex(digest)).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def merkle_levels(digests):
+    """All levels of the tree, leaves first; levels[-1][0] is the root."""
+    level = [leaf_hash(d) for d in digests]
+    if not level:
+        raise ValueError("empty batch")
+    levels = [level]
+    while len(level) > 1:
+        nxt = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        levels.append(nxt)
+        level = nxt
+    return levels
+
+
+def merkle_root(levels):
+    return levels[-1][0].hex()
+
+
+def inclusion_proof(levels, index):
+    """[{'hash': sibling, 'side': 'left'|'right'}, ...] from the leaf up."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({'hash': level[sibling].hex(), 'side': 'left' if sibling < index else 'right'})
+        index //= 2
+    return proof
+
+
+def verify_inclusion(digest, proof, root):
+    node = leaf_hash(digest)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        node = node_hash(sibling, node) if step['side'] == 'left' else node_hash(node, sibling)
+    return node.hex() == root
+
+
+def chain_hash(prev_chain, root):
+    return hashlib.sha256(bytes.fromhex(prev_chain) + bytes.fromhex(root)).hexdigest()
@@ -0,0 +1,192 @@
+"""
+In-process metrics in the Prometheus text exposition format (no client library).
+
+    REPORTCARE_METRICS=1 flask --app app run       # then GET /metrics
+
+Counters and histograms live in this process's memory; app.py registers the
+HTTP/DB hooks and serves render() on /metrics. With REPORTCARE_METRICS unset
+the hooks are never installed, span() hands back a shared no-op context and
+observe()/inc() return on their first line, so instrumented code costs one
+attribute check.
+
+Every gunicorn worker keeps its own numbers and /metrics shows the ones of
+the worker that answered the scrape; aggregate with rate()/sum() over several
+scrapes, or run a single worker where exact totals matter.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+ENABLED = os.environ.get('REPORTCARE_METRICS', '0') == '1'
+PREFIX = 'reportcare_'
+
+# Seconds: 0.5 ms .. 10 s, enough resolution for a single-row predict and a cold PDF render
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}             # label values tuple -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, count in items:
+            yield f"{self.name}{_label_str(self.labels, values)} {_number(count)}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}             # label values tuple -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self, label_values) if ENABLED else _NO_SPAN
+
+    def samples(self):
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._values.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                yield f"{self.name}_bucket{_label_str(self.labels, values, [le])} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labels, values)} {_number(float(series[-1]))}"
+            yield f"{self.name}_count{_label_str(self.labels, values)} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+_NO_SPAN = nullcontext()
+
+
+def counter(name, help, labels=()):
+    metric = Counter(name, help, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def collector(fn):
+    """Register fn() -> [(name, kind, help, [(labels dict, value), ...]), ...], called at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+# Timing spans for the hot paths (inference, commits, PDF rendering): one histogram, labelled by span
+span_seconds = histogram('span_duration_seconds', "Time spent in instrumented code sections.", ('span',))
+
+
+def span(name):
+    """with metrics.span('model.predict_proba'): ...  (no-op unless metrics are enabled)"""
+    return _Timer(span_seconds, (name,)) if ENABLED else _NO_SPAN
+
+
+# LRUCache-style caches (hits / misses / __len__) reported at scrape time
+_caches = {}
+
+
+def register_cache(name, cache):
+    _caches[name] = cache
+
+
+@collector
+def cache_metrics():
+    hits = [({'cache': n}, c.hits) for n, c in sorted(_caches.items())]
+    misses = [({'cache': n}, c.misses) for n, c in sorted(_caches.items())]
+    sizes = [({'cache': n}, len(c)) for n, c in sorted(_caches.items())]
+    return [
+        ('cache_hits_total', 'counter', "Cache lookups answered from the cache.", hits),
+        ('cache_misses_total', 'counter', "Cache lookups that missed.", misses),
+        ('cache_entries', 'gauge', "Entries currently held in the cache.", sizes),
+    ]
+
+
+def render():
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for fn in _collectors:
+        for name, kind, help, samples in fn():
+            name = PREFIX + name
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_str = _label_str(labels.keys(), labels.values())
+                lines.append(f"{name}{label_str} {_number(value)}")
+    return '\n'.join(lines) + '\n'
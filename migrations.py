@@ -0,0 +1,145 @@
+"""
+Minimal schema migrations for ReportCare.
+
+db.create_all() only creates missing tables; it never adds indexes or columns
+to tables that already exist in users.db. Every change to an existing table
+goes into MIGRATIONS instead. Each entry is (id, steps), where a step is a SQL
+string or a callable taking a connection. Applied ids are recorded in the
+schema_migrations table. Steps must be idempotent, because a fresh database
+already has everything create_all() built from the models.
+
+Run with:  flask --app app db-upgrade
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+
+def create_index(name, table, columns):
+    return f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({columns})'
+
+
+def add_column(table, column, ddl_type):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    def step(conn):
+        if table not in inspect(conn).get_table_names():
+            return      # not an app database (e.g. the benchmarks' bare schema)
+        existing = {c['name'] for c in inspect(conn).get_columns(table)}
+        if column not in existing:
+            conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl_type}'))
+    return step
+
+
+def backfill_verification_snapshot(conn):
+    if 'verification_snapshot' not in inspect(conn).get_table_names():
+        return      # not an app database (e.g. the benchmarks' bare schema)
+    conn.execute(text('DELETE FROM verification_snapshot'))
+    conn.execute(text(
+        'INSERT INTO verification_snapshot (patient_id, report_id, report_date) '
+        'SELECT r.patient_id, r.id, r.date FROM report r WHERE r.patient_id IS NOT NULL AND r.id = ('
+        'SELECT r2.id FROM report r2 WHERE r2.patient_id = r.patient_id ORDER BY r2.date DESC, r2.id DESC LIMIT 1)'
+    ))
+
+
+def ledger_append_only_triggers(conn):
+    tables = inspect(conn).get_table_names()
+    if conn.dialect.name != 'sqlite' or 'ledger_batch' not in tables:
+        return
+    for sql in (
+        "CREATE TRIGGER IF NOT EXISTS ledger_batch_no_update BEFORE UPDATE ON ledger_batch "
+        "BEGIN SELECT RAISE(ABORT, 'ledger_batch is append-only'); END",
+        "CREATE TRIGGER IF NOT EXISTS ledger_batch_no_delete BEFORE DELETE ON ledger_batch "
+        "BEGIN SELECT RAISE(ABORT, 'ledger_batch is append-only'); END",
+        "CREATE TRIGGER IF NOT EXISTS report_digest_sealed_no_update BEFORE UPDATE ON report_digest "
+        "WHEN OLD.batch_id IS NOT NULL BEGIN SELECT RAISE(ABORT, 'sealed report digests are immutable'); END",
+        "CREATE TRIGGER IF NOT EXISTS report_digest_sealed_no_delete BEFORE DELETE ON report_digest "
+        "WHEN OLD.batch_id IS NOT NULL BEGIN SELECT RAISE(ABORT, 'sealed report digests are immutable'); END",
+    ):
+        conn.execute(text(sql))
+
+
+def backfill_lab_stats(conn):
+    """LabStats rows for labs that have none, counted from their patients and reports."""
+    if 'lab_stats' not in inspect(conn).get_table_names():
+        return      # not an app database (e.g. the benchmarks' bare schema)
+    # Same buckets as app.rebuild_lab_stats(): risk_score NULL counts as Low Risk
+    conn.execute(text(
+        'INSERT INTO lab_stats (lab_id, total_patients, total_predictions, diabetic_count, normal_count, '
+        'high_risk_count, medium_risk_count, low_risk_count, updated_at) '
+        'SELECT u.id, COALESCE(p.n, 0), COALESCE(r.total, 0), COALESCE(r.diabetic, 0), '
+        'COALESCE(r.total - r.diabetic, 0), COALESCE(r.high, 0), COALESCE(r.medium, 0), '
+        'COALESCE(r.total - r.high - r.medium, 0), :now '
+        'FROM "user" u '
+        'LEFT JOIN (SELECT lab_id, COUNT(*) AS n FROM patient GROUP BY lab_id) p ON p.lab_id = u.id '
+        'LEFT JOIN (SELECT pt.lab_id, COUNT(*) AS total, '
+        "SUM(CASE WHEN rp.prediction_result = 'Diabetic' THEN 1 ELSE 0 END) AS diabetic, "
+        'SUM(CASE WHEN rp.risk_score > 70 THEN 1 ELSE 0 END) AS high, '
+        'SUM(CASE WHEN rp.risk_score >= 40 AND rp.risk_score <= 70 THEN 1 ELSE 0 END) AS medium '
+        'FROM report rp JOIN patient pt ON rp.patient_id = pt.id GROUP BY pt.lab_id) r ON r.lab_id = u.id '
+        "WHERE (u.role = 'Lab' OR p.n IS NOT NULL) "
+        'AND NOT EXISTS (SELECT 1 FROM lab_stats s WHERE s.lab_id = u.id)'
+    ), {'now': datetime.utcnow()})
+
+
+def drop_patient_search_index(conn):
+    """
+    Drop the fts5 patient index and its triggers; setup_search() builds them
+    again (backfilled from patient) right after the migrations run.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    for suffix in ('_ai', '_ad', '_au'):
+        conn.execute(text(f'DROP TRIGGER IF EXISTS patient_fts{suffix}'))
+    conn.execute(text('DROP TABLE IF EXISTS patient_fts'))
+
+
+MIGRATIONS = [
+    ('0001_hot_path_indexes', [
+        create_index('ix_patient_lab_id_name', 'patient', 'lab_id, name'),
+        create_index('ix_report_patient_id_date', 'report', 'patient_id, date, id'),
+        create_index('ix_analysis_user_id_timestamp', 'analysis', 'user_id, timestamp'),
+        create_index('ix_user_role_name', 'user', 'role, name'),
+        'ANALYZE',
+    ]),
+    # Backfill the patient -> latest report pointers for reports created before the table existed
+    ('0002_verification_snapshot', [backfill_verification_snapshot]),
+    # Sealed ledger batches and their digests can only be appended, never changed
+    ('0003_ledger_append_only', [ledger_append_only_triggers]),
+    # Per-feature contributions printed on the PDF; NULL for reports made before
+    ('0004_report_attributions', [add_column('report', 'attributions', 'TEXT')]),
+    # Every lab gets its counters row up front, so the dashboard never has to create one
+    ('0005_lab_stats_rows', [backfill_lab_stats]),
+    # Name words now split on every punctuation character; entries indexed the
+    # old way can't be deleted by the new triggers, so reindex
+    ('0006_search_word_separators', [drop_patient_search_index]),
+    # The lab moved from a word prefix ("l12xanna") into its own column of patient_fts
+    ('0007_search_lab_column', [drop_patient_search_index]),
+]
+
+
+def applied_migrations(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'id VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)'
+    ))
+    return {row[0] for row in conn.execute(text('SELECT id FROM schema_migrations'))}
+
+
+def upgrade(engine):
+    """Apply every pending migration, each in its own transaction. Returns the ids applied."""
+    with engine.begin() as conn:
+        done = applied_migrations(conn)
+
+    newly_applied = []
+    for migration_id, steps in MIGRATIONS:
+        if migration_id in done:
+            continue
+        with engine.begin() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(text('INSERT INTO schema_migrations (id, applied_at) VALUES (:id, :at)'),
+                         {'id': migration_id, 'at': datetime.utcnow()})
+        newly_applied.append(migration_id)
+    return newly_applied
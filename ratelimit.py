@@ -0,0 +1,68 @@
+"""
+In-process token-bucket rate limiting.
+
+Every client gets a bucket of up to `burst` tokens that refills at `rate`
+tokens per second; a call costing n tokens goes through only if the client's
+bucket, and the optional bucket shared by all clients, both hold n. Buckets
+live in this process, so with W gunicorn workers a client can reach W x rate.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst           # new clients start with a full bucket
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost):
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rate, burst, global_rate=None, global_burst=None, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients    # least recently seen clients are forgotten (and start full again)
+        self.allowed = 0
+        self.rejected = 0
+        self._clients = OrderedDict()
+        self._global = TokenBucket(global_rate, global_burst, time.monotonic()) if global_rate else None
+        self._lock = threading.Lock()
+
+    def check(self, client, cost=1):
+        """Take `cost` tokens for `client` and return 0.0, or return the seconds to wait and take nothing."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._clients.get(client)
+            if bucket is None:
+                bucket = self._clients[client] = TokenBucket(self.rate, self.burst, now)
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+
+            buckets = [bucket, self._global] if self._global else [bucket]
+            for b in buckets:
+                b.refill(now)
+            wait = max(b.wait_time(cost) for b in buckets)
+            if wait > 0:
+                self.rejected += 1
+                return wait
+            for b in buckets:
+                b.tokens -= cost
+            self.allowed += 1
+            return 0.0
+
+    def stats(self):
+        return {"clients": len(self._clients), "allowed": self.allowed, "rejected": self.rejected,
+                "rate": self.rate, "burst": self.burst}
@@ -0,0 +1,145 @@
+"""
+Local, versioned model registry.
+
+    models/
+        CURRENT                          <- name of the version the app serves
+        20261018-101500-3fa2c91b/
+            model.pkl  model.npz  scaler.pkl  scaler.npz  meta.json
+
+A version directory is written completely under a temporary name and then
+renamed into place, and CURRENT is swapped with os.replace(), so a running
+app polling CURRENT never sees a half-written model. Version directories are
+never modified after publishing; rolling back is just activating an older one.
+
+    python registry.py list
+    python registry.py activate 20261018-101500-3fa2c91b
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import uuid
+from datetime import datetime
+
+from forest import CompiledForest, CompiledScaler
+
+REGISTRY_DIR = os.environ.get('REPORTCARE_MODEL_REGISTRY', 'models')
+CURRENT_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+ARTIFACTS = {'pkl': 'model.pkl', 'npz': 'model.npz', 'scaler': 'scaler.pkl', 'scaler_npz': 'scaler.npz'}
+
+
+def version_dir(version, registry=REGISTRY_DIR):
+    return os.path.join(registry, version)
+
+
+def artifact_paths(version, registry=REGISTRY_DIR):
+    return {kind: os.path.join(registry, version, name) for kind, name in ARTIFACTS.items()}
+
+
+def list_versions(registry=REGISTRY_DIR):
+    if not os.path.isdir(registry):
+        return []
+    return sorted(name for name in os.listdir(registry)
+                  if os.path.exists(os.path.join(registry, name, META_FILE)))
+
+
+def current_version(registry=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_meta(version, registry=REGISTRY_DIR):
+    with open(os.path.join(registry, version, META_FILE)) as f:
+        return json.load(f)
+
+
+def activate(version, registry=REGISTRY_DIR):
+    """Point CURRENT at a published version (atomic; running apps pick it up on their next check)."""
+    if not os.path.exists(os.path.join(registry, version, META_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    tmp_path = os.path.join(registry, f"{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(registry, CURRENT_FILE))
+
+
+def scaler_fingerprint(scaler):
+    return hashlib.sha256(pickle.dumps(
+        {k: v for k, v in sorted(vars(scaler).items()) if k.endswith('_')}, protocol=4)).hexdigest()
+
+
+def publish(model, scaler, meta, registry=REGISTRY_DIR, make_current=True):
+    """
+    Save model + compiled forest + scaler + meta.json as a new version and
+    return its name. `meta` is extended with the content hash, file sizes and
+    tree statistics.
+    """
+    os.makedirs(registry, exist_ok=True)
+    tmp_dir = os.path.join(registry, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        paths = {kind: os.path.join(tmp_dir, name) for kind, name in ARTIFACTS.items()}
+        with open(paths['pkl'], 'wb') as f:
+            pickle.dump(model, f)
+        with open(paths['scaler'], 'wb') as f:
+            pickle.dump(scaler, f)
+        forest = CompiledForest.from_sklearn(model)
+        forest.save(paths['npz'])
+        CompiledScaler.from_sklearn(scaler).save(paths['scaler_npz'])
+
+        # Content hash: same data + same hyperparameters + same seed => same hash
+        model_hash = hashlib.sha256(
+            (forest.fingerprint() + scaler_fingerprint(scaler)).encode()).hexdigest()
+        created = datetime.now()
+        version = f"{created:%Y%m%d-%H%M%S}-{model_hash[:8]}"
+
+        meta = dict(meta)
+        meta.update({
+            'version': version,
+            'created_at': created.isoformat(timespec='seconds'),
+            'model_hash': model_hash,
+            'n_trees': forest.n_estimators,
+            'n_nodes': forest.node_count,
+            'max_depth': forest.max_depth,
+            'sizes_bytes': {name: os.path.getsize(paths[kind]) for kind, name in ARTIFACTS.items()},
+        })
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        os.rename(tmp_dir, version_dir(version, registry))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if make_current:
+        activate(version, registry)
+    return version, meta
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'list'
+    if command == 'list':
+        current = current_version()
+        for version in list_versions():
+            meta = read_meta(version)
+            metrics = meta.get('metrics', {})
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  trees={meta.get('n_trees')} nodes={meta.get('n_nodes')}"
+                  f"  accuracy={metrics.get('accuracy')}  npz={meta['sizes_bytes'].get('model.npz', 0) / 1e6:.1f} MB")
+    elif command == 'activate' and len(argv) > 2:
+        activate(argv[2])
+        print(f"Now serving {argv[2]}")
+    else:
+        print("usage: python registry.py list | activate VERSION")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,273 @@
+"""
+Report PDF rendering and the on-disk PDF cache.
+
+Reports are immutable, so a rendered PDF is stored on disk under the hash of
+everything printed on it (PDF_TEMPLATE_VERSION + report/patient/lab fields).
+Repeat downloads are a file read, and the same hash is the HTTP ETag.
+
+This module must not import app.py: the export worker processes (jobs.py)
+import it to render PDFs in parallel.
+"""
+import hashlib
+import json
+import os
+import uuid
+from types import SimpleNamespace
+
+import assets
+import images
+import metrics
+from cache import LRUCache
+from ledger import PDF_DIGEST_MARKER, report_digest
+
+PDF_TEMPLATE_VERSION = 5          # bump whenever render_report_pdf() output changes
+ATTRIBUTION_PDF_TOP = 5           # contributors listed under AI RISK ANALYSIS
+
+
+# Decoded logo/signature images, reused across documents (key: path, mtime, size)
+image_cache = LRUCache(maxsize=128)
+metrics.register_cache('pdf_image', image_cache)
+
+_logo_path = None
+
+
+def logo_path():
+    """The 256 px logo from the asset build (python assets.py) if there is one, else the 2500 px original."""
+    global _logo_path
+    if _logo_path is None:
+        _logo_path = assets.built_path('images/shield.png')
+    return _logo_path
+
+
+pdf_cache_lookups = metrics.counter('pdf_cache_lookups_total', "PDF cache lookups by result.", ('result',))
+pdf_bytes = metrics.histogram('pdf_size_bytes', "Size of freshly rendered report PDFs.", buckets=metrics.SIZE_BUCKETS)
+
+
+def place_image(pdf, path, **kwargs):
+    """pdf.image() without re-reading and re-decoding the file for every PDF."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    info = image_cache.get(key)
+    if info is None:
+        from fpdf import FPDF
+        scratch = FPDF()
+        scratch.add_page()
+        scratch.image(path, x=0, y=0, w=1)
+        info = scratch.images[path]
+        image_cache.set(key, info)
+    if path not in pdf.images:
+        # FPDF deletes 'data'/'smask' from the dict while writing, so give it a copy
+        pdf.images[path] = dict(info, i=len(pdf.images) + 1)
+    pdf.image(path, **kwargs)
+
+
+def report_pdf_key(report, patient, lab):
+    fields = [
+        PDF_TEMPLATE_VERSION, report.id, str(report.date), report.prediction_result,
+        report.accuracy, report.risk_score, report.remarks,
+        report.glucose, report.bp, report.insulin, report.bmi, report.pregnancies, report.skin, report.dpf,
+        patient.id, patient.name, patient.age, patient.gender,
+        lab.id, lab.name, lab.address, lab.phone, lab.license_no, lab.signature_img,
+        report_digest(report, patient), logo_path(), report.attributions
+    ]
+    return hashlib.sha256(json.dumps(fields, default=str).encode('utf-8')).hexdigest()
+
+
+def cached_pdf_path(cache_folder, key):
+    return os.path.join(cache_folder, key[:2], f"{key}.pdf")
+
+
+def write_file_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def render_report_pdf(report, patient, lab):
+    """Build the one-page report PDF and return its bytes."""
+    # Imported here: only processes that actually render pay for fpdf
+    from fpdf import FPDF
+
+    formatted_pat_id = f"PAT-{patient.id:03d}"
+    digest = report_digest(report, patient)
+
+    pdf = FPDF()
+    # Keywords are stored uncompressed, so the ledger can find the digest in an uploaded PDF
+    pdf.set_keywords(PDF_DIGEST_MARKER + digest)
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=False) # 1 Page constraint
+    
+    # --- 1. HEADER WITH SHIELD 🛡️ ---
+    logo = logo_path()
+    
+    if os.path.exists(logo):
+        # x=10, y=8 coordinates hain, w=12 logo ki width hai
+        place_image(pdf, logo, x=10, y=8, w=12)
+    else:
+        # Agar image nahi mili toh placeholder text dikhayega crash hone ki jagah
+        pdf.set_xy(10, 10)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(12, 12, "LOGO", border=1, align='C')
+    
+    pdf.set_font("Arial", 'B', 20)
+    pdf.set_text_color(39, 174, 96) 
+    pdf.set_xy(25, 10)
+    pdf.cell(100, 10, "REPORTCARE")
+    
+    pdf.set_font("Arial", size=9)
+    pdf.set_text_color(100)
+    pdf.set_xy(130, 10)
+    pdf.cell(70, 10, " AI-VERIFIED CLINICAL REPORT", ln=True, align='R')
+    pdf.line(10, 25, 200, 25)
+    pdf.ln(8)
+
+    # --- 2. PATIENT INFO BOX ---
+    pdf.set_fill_color(245, 245, 245)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_text_color(0)
+    pdf.cell(190, 8, f" Patient ID: {formatted_pat_id} | Name: {patient.name.upper()}", border=1, ln=True, fill=True)
+    pdf.set_font("Arial", size=9)
+    pdf.cell(95, 7, f" Age/Gender: {patient.age} / {patient.gender}", border=1)
+    pdf.cell(95, 7, f" Date: {report.date.strftime('%d-%m-%Y %I:%M %p')}", border=1, ln=True)
+    pdf.ln(5)
+
+    # --- 3. DIAGNOSIS RESULT ---
+    pdf.set_font("Arial", 'B', 14)
+    status_color = (231, 76, 60) if report.prediction_result == 'Diabetic' else (39, 174, 96)
+    pdf.set_text_color(*status_color)
+    pdf.cell(190, 10, f"DIAGNOSIS RESULT: {report.prediction_result.upper()}", ln=True, align='C')
+    pdf.ln(4)
+
+    # --- 4. CLINICAL PARAMETERS (Vertical Table) ---
+    pdf.set_text_color(0)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(190, 7, "TEST PARAMETERS:", ln=True)
+    pdf.set_font("Arial", size=10)
+    
+    # List of parameters to show line by line
+    params = [
+        ("Glucose Level", f"{report.glucose} mg/dL"),
+        ("Blood Pressure", f"{report.bp} mmHg"),
+        ("Insulin Level", f"{report.insulin} mIU/L"),
+        ("BMI (Body Mass Index)", f"{report.bmi} kg/m2"),
+        ("Pregnancies", f"{report.pregnancies}"),
+        ("Skin Thickness", f"{report.skin} mm"),
+        ("DPF Value", f"{report.dpf}")
+    ]
+
+    for label, val in params:
+        pdf.set_fill_color(255, 255, 255)
+        pdf.cell(80, 7, f" {label}", border='B')
+        pdf.set_font("Arial", 'B', 10)
+        pdf.cell(110, 7, f"{val}", border='B', ln=True, align='R')
+        pdf.set_font("Arial", size=10)
+
+    pdf.ln(6)
+
+    # --- 5. AI METRICS & SOLUTION (One below another) ---
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(190, 7, "AI ANALYSIS METRICS:", ln=True)
+    pdf.set_font("Arial", size=9)
+    pdf.cell(190, 6, f"Prediction Confidence: {report.accuracy}", ln=True)
+    # Risk Percentage & Status
+    risk_val = report.risk_score if report.risk_score else 0.0
+    if risk_val > 70:
+        level = "HIGH"
+    elif 40 <= risk_val <= 70:
+        level = "MEDIUM"
+    else:
+        level = "LOW"
+
+    
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(95, 7, f"Risk Probability: {risk_val}% ({level})", border='B', ln=True, align='R')
+    
+    pdf.ln(4)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(190, 7, "AI SUGGESTED SOLUTION:", ln=True)
+    pdf.set_font("Arial", 'I', 9)
+    sol = "Maintain low sugar diet, regular exercise and consult a specialist." if report.prediction_result == "Diabetic" else "Everything looks normal. Maintain a healthy lifestyle."
+    pdf.multi_cell(190, 5, sol)
+
+
+    # --- 5. AI METRICS & RISK ANALYSIS ---
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(190, 7, "AI RISK ANALYSIS & METRICS:", ln=True)
+    pdf.set_font("Arial", size=10)
+    # Top contributors: kis value ne risk kitna badhaya/ghataya (older reports have none stored)
+    if report.attributions:
+        pdf.set_font("Arial", 'I', 8)
+        pdf.set_text_color(100)
+        pdf.cell(190, 5, "Main factors behind the risk probability (percentage points):", ln=True)
+        pdf.set_text_color(0)
+        for factor in json.loads(report.attributions)[:ATTRIBUTION_PDF_TOP]:
+            contribution = factor['contribution']
+            pdf.set_font("Arial", size=9)
+            pdf.cell(80, 5, f" {factor['label']} ({factor['value']:g})", border='B')
+            pdf.set_font("Arial", 'B', 9)
+            pdf.set_text_color(*((231, 76, 60) if contribution > 0 else (39, 174, 96)))
+            pdf.cell(110, 5, f"{contribution:+.2f} pts", border='B', ln=True, align='R')
+            pdf.set_text_color(0)
+
+    # --- 6. REMARKS WITH PATIENT ID ---
+    pdf.ln(4)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(190, 7, f"SPECIALIST REMARKS (Patient ID: {formatted_pat_id}):", ln=True)
+    pdf.set_font("Arial", size=9)
+    pdf.multi_cell(190, 5, report.remarks if report.remarks else "Values are within analyzed range of the ML model.")
+
+    # --- 7. FOOTER: OWNER & SIGNATURE (Bottom of Page) ---
+    pdf.set_y(245) # Positioning at the bottom
+    pdf.line(10, 244, 200, 244)
+    
+    # Lab Owner Info (Left Side)
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(100, 5, f"Lab Owner: {lab.name}", ln=True)
+    pdf.set_font("Arial", size=8)
+    pdf.set_text_color(50)
+    pdf.cell(100, 4, f"Address: {lab.address}", ln=True)
+    pdf.cell(100, 4, f"Contact: {lab.phone}", ln=True)
+    pdf.cell(100, 4, f"License No: {lab.license_no}", ln=True)
+
+    # Lab Signature (Right Side)
+    if lab.signature_img:
+        # Print-sized copy, not whatever resolution the lab uploaded
+        sig_path = images.variant_path('signature', lab.signature_img, 'pdf')
+        if sig_path:
+            # Signature Image positioned at bottom-right
+            place_image(pdf, sig_path, x=150, y=248, w=40)
+
+    # Disclaimer
+    pdf.set_y(280)
+    pdf.set_font("Arial", 'I', 7)
+    pdf.set_text_color(150)
+    pdf.cell(0, 5, "This is a computer-generated report and does not require a physical signature for validity.", align='C')
+    pdf.set_y(285)
+    pdf.set_font("Courier", size=6)
+    pdf.cell(0, 4, f"Report digest (SHA-256): {digest}  -  verify at /verifyreport", align='C')
+
+    # FINAL OUTPUT: dest='S' se pehle output lo, fir encoding error ko 'replace' se handle karo
+    raw_pdf_string = pdf.output(dest='S')
+    return raw_pdf_string.encode('latin-1', 'replace')
+
+
+def render_cached(cache_folder, report, patient, lab):
+    """
+    Return the cached PDF path for a report, rendering it first on a miss.
+    Accepts ORM objects or plain dicts (as sent to worker processes).
+    """
+    if isinstance(report, dict):
+        report, patient, lab = SimpleNamespace(**report), SimpleNamespace(**patient), SimpleNamespace(**lab)
+    key = report_pdf_key(report, patient, lab)
+    path = cached_pdf_path(cache_folder, key)
+    if os.path.exists(path):
+        pdf_cache_lookups.inc('hit')
+        return path
+    pdf_cache_lookups.inc('miss')
+    with metrics.span('pdf.render'):
+        data = render_report_pdf(report, patient, lab)
+    pdf_bytes.observe(len(data))
+    write_file_atomic(path, data)
+    return path
@@ -0,0 +1,50 @@
+"""
+Bulk import: a chunk with no valid rows still advances the job.
+
+Needs a trained model (python train.py) in the repository root.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture()
+def app_module(tmp_path, monkeypatch):
+    # The database URL is read at import, so the app is imported fresh against a scratch file
+    monkeypatch.setenv('REPORTCARE_DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.chdir(ROOT)
+    monkeypatch.syspath_prepend(ROOT)
+    sys.modules.pop('app', None)
+    import app as module
+    module.init_db()
+    yield module
+    sys.modules.pop('app', None)
+
+
+def test_import_resumes_past_a_chunk_of_invalid_rows(app_module, tmp_path, monkeypatch):
+    m = app_module
+    monkeypatch.setattr(m, 'IMPORT_CHUNK_ROWS', 1)
+    with m.app.app_context():
+        lab = m.User(role='Lab', name='Lab', email='lab@test', license_no='LAB-T', password='x')
+        m.db.session.add(lab)
+        m.db.session.commit()
+        lab_id = lab.id
+
+    path = tmp_path / 'reports.csv'
+    path.write_text("Name,Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age\n"
+                    "Asha,2,148,72,35,0,33.6,0.627,45\n"
+                    "Ravi,1,85,66,29,0,26.6,0.351,\n")
+    result = m.app.test_cli_runner().invoke(args=['import-reports', str(path), '--lab-id', str(lab_id)])
+    assert result.exit_code == 0, result.output
+
+    with m.app.app_context():
+        job = m.ImportJob.query.one()
+        assert (job.status, job.rows_done, job.rows_skipped) == ('done', 1, 1)
+        assert 'line 3' in job.errors
+        assert job.offset == path.stat().st_size
+        assert [p.name for p in m.Patient.query.filter_by(lab_id=lab_id)] == ['Asha']
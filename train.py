@@ -1,42 +1,163 @@
+"""
+Training pipeline: fit the ExtraTrees model on diabetes.csv and publish it to
+the model registry (registry.py) as a new version, which the app then serves.
+
+The model is first fitted on a stratified 80% split and scored on the held-out
+20%; the published model is then refitted with the same parameters on every
+row (--no-refit publishes the evaluated split model instead). meta.json says
+which one was published ('fit_on') next to the held-out metrics.
+
+    python train.py                              # 1000 trees, all cores, activate
+    python train.py --n-estimators 300 --max-depth 12 --no-activate
+
+Same data + same parameters + same seed => same trees and the same model hash,
+whatever the number of cores.
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
 import pandas as pd
-import pickle
+import sklearn
 from sklearn.ensemble import ExtraTreesClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 
-# 1. Load Data
-file_path = r'diabetes\diabetes.csv'
-df = pd.read_csv(file_path)
+import registry
 
-# 2. Advanced Preprocessing (Accuracy Booster)
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diabetes', 'diabetes.csv')
+TARGET = 'Outcome'
 # 0 values ko median se replace karna medical data mein accuracy 10% badha deta hai
-cols_to_fix = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
-for col in cols_to_fix:
-    df[col] = df[col].replace(0, df[col].median())
-
-X = df.drop('Outcome', axis=1)
-y = df['Outcome']
-
-# 3. Scaling (Using MinMaxScaler for better range control)
-scaler = MinMaxScaler()
-X_scaled = scaler.fit_transform(X)
-
-# 4. Extreme Model (ExtraTrees)
-# n_estimators=1000: Bahut saare decision makers
-# bootstrap=False: Har data point ko deep learn karne ke liye
-model = ExtraTreesClassifier(
-    n_estimators=1000, 
-    criterion='entropy', 
-    max_depth=None, 
-    min_samples_split=2, 
-    random_state=42,
-    bootstrap=False
-)
-
-model.fit(X_scaled, y)
-
-# 5. Save Model and Scaler
-pickle.dump(model, open('model.pkl', 'wb'))
-pickle.dump(scaler, open('scaler.pkl', 'wb'))
-
-final_score = model.score(X_scaled, y) * 100
-print(f"🔥 FINAL POWER ACCURACY: {round(final_score, 2)}%")
\ No newline at end of file
+COLS_TO_FIX = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+TEST_SIZE = 0.2
+SEED = 42
+
+
+def load_data(path=DATA_PATH):
+    """(features DataFrame, target Series, sha256 of the file)."""
+    with open(path, 'rb') as f:
+        data_hash = hashlib.sha256(f.read()).hexdigest()
+    df = pd.read_csv(path)
+    return df.drop(TARGET, axis=1), df[TARGET], data_hash
+
+
+def fit_scaler(X):
+    """Median fix on a copy of X, then a MinMaxScaler fitted on it; (scaler, scaled X)."""
+    X = X.copy()
+    for col in COLS_TO_FIX:
+        X[col] = X[col].replace(0, X[col].median())
+
+    # Scaling (Using MinMaxScaler for better range control)
+    scaler = MinMaxScaler()
+    return scaler, scaler.fit_transform(X)
+
+
+def split_and_scale(X, y, test_size=TEST_SIZE, seed=SEED):
+    """
+    Held-out split first, then the median fix and MinMaxScaler fitted on the
+    training rows only, so the test metrics never see test data statistics.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=seed, stratify=y)
+    scaler, X_train_scaled = fit_scaler(X_train)
+    # Test rows go through exactly what the app does: raw panel -> scaler -> model
+    X_test_scaled = scaler.transform(X_test)
+    return scaler, X_train_scaled, X_test_scaled, y_train, y_test
+
+
+def build_model(n_estimators=1000, max_depth=None, n_jobs=-1, seed=SEED):
+    # n_estimators=1000: Bahut saare decision makers
+    # bootstrap=False: Har data point ko deep learn karne ke liye
+    return ExtraTreesClassifier(
+        n_estimators=n_estimators,
+        criterion='entropy',
+        max_depth=max_depth,
+        min_samples_split=2,
+        random_state=seed,
+        bootstrap=False,
+        n_jobs=n_jobs
+    )
+
+
+def evaluate(model, X_test, y_test):
+    proba = model.predict_proba(X_test)[:, 1]
+    pred = model.classes_.take((proba > 0.5).astype(int))
+    return {
+        'accuracy': round(float(accuracy_score(y_test, pred)), 4),
+        'precision': round(float(precision_score(y_test, pred, zero_division=0)), 4),
+        'recall': round(float(recall_score(y_test, pred, zero_division=0)), 4),
+        'f1': round(float(f1_score(y_test, pred, zero_division=0)), 4),
+        'roc_auc': round(float(roc_auc_score(y_test, proba)), 4),
+        'n_test': int(len(y_test)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--n-estimators', type=int, default=1000)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="cores used for fitting (-1 = all)")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--registry', default=registry.REGISTRY_DIR)
+    parser.add_argument('--no-activate', action='store_true', help="publish without making it CURRENT")
+    parser.add_argument('--no-refit', action='store_true',
+                        help="publish the model fitted on the training split instead of refitting on all rows")
+    args = parser.parse_args()
+
+    # 1. Load Data
+    X, y, data_hash = load_data(args.data)
+
+    # 2. Preprocessing + 3. Scaling
+    scaler, X_train, X_test, y_train, y_test = split_and_scale(X, y, seed=args.seed)
+
+    # 4. Extreme Model (ExtraTrees), fitted on all cores
+    model = build_model(args.n_estimators, args.max_depth, args.n_jobs, args.seed)
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - t0
+    model.n_jobs = None     # the app predicts one panel at a time; no thread pool per request
+
+    metrics = evaluate(model, X_test, y_test)
+
+    # 4b. Refit scaler + model on all rows; the held-out metrics above estimate how it does
+    if not args.no_refit:
+        scaler, X_all = fit_scaler(X)
+        model = build_model(args.n_estimators, args.max_depth, args.n_jobs, args.seed)
+        t0 = time.perf_counter()
+        model.fit(X_all, y)
+        train_seconds += time.perf_counter() - t0
+        model.n_jobs = None
+
+    # 5. Publish model + compiled forest + scaler as a new registry version
+    version, meta = registry.publish(model, scaler, {
+        'features': list(X.columns),
+        'target': TARGET,
+        'classes': [int(c) for c in model.classes_],
+        'params': {k: v for k, v in model.get_params().items() if k != 'n_jobs'},
+        'data': {'path': os.path.relpath(args.data), 'sha256': data_hash,
+                 'n_train': int(len(y_train)), 'n_test': int(len(y_test)), 'seed': args.seed},
+        # 'all': refitted on n_train + n_test rows after scoring; 'train_split': the scored model itself
+        'fit_on': 'train_split' if args.no_refit else 'all',
+        'metrics': metrics,
+        'train_seconds': round(train_seconds, 2),
+        'n_jobs': args.n_jobs,
+        'sklearn_version': sklearn.__version__,
+        'numpy_version': np.__version__,
+    }, registry=args.registry, make_current=not args.no_activate)
+
+    sizes = meta['sizes_bytes']
+    print(f"Version:   {version}{'' if args.no_activate else ' (now CURRENT)'}")
+    print(f"Trees:     {meta['n_trees']} / {meta['n_nodes']:,} nodes, max depth {meta['max_depth']}")
+    print(f"Train:     {train_seconds:.2f}s on n_jobs={args.n_jobs}, "
+          f"published model fitted on {'the training split' if args.no_refit else 'all rows'}")
+    print(f"Size:      model.npz {sizes['model.npz'] / 1e6:.1f} MB, model.pkl {sizes['model.pkl'] / 1e6:.1f} MB")
+    print("Held-out:  " + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+    print(f"🔥 FINAL POWER ACCURACY (held-out): {round(metrics['accuracy'] * 100, 2)}%")
+
+
+if __name__ == '__main__':
+    main()
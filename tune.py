@@ -0,0 +1,192 @@
+"""
+Model size vs latency tuning.
+
+Fits the full production forest (train.py settings) as the baseline, then a
+grid of smaller forests (n_estimators x max_depth), optionally distilled from
+the baseline. Every candidate is exported to the compiled format the app
+serves and measured for held-out accuracy, model.npz size, load time and
+p50/p99 single-row predict_proba latency. The smallest candidate whose
+accuracy is within --max-accuracy-drop of the baseline is published to the
+model registry (and served after `python registry.py activate VERSION`, or
+straight away with --activate).
+
+    python tune.py
+    python tune.py --n-estimators 25,50,100 --max-depth none,8,12 --distill --json tune.json
+
+Distillation: the baseline labels the training rows plus jittered copies of
+them, and each point is given to the student twice, as class 1 with weight p
+and as class 0 with weight 1 - p (p = baseline probability). The student is a
+plain ExtraTreesClassifier whose leaves hold the baseline's averaged
+probabilities, so it needs no changes to forest.py or the app.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import registry
+from forest import CompiledForest
+from train import DATA_PATH, SEED, build_model, evaluate, load_data, split_and_scale
+
+DEFAULT_N_ESTIMATORS = '25,50,100,200,400'
+DEFAULT_MAX_DEPTH = 'none,6,8,12,16'
+LATENCY_ROWS = 300
+LATENCY_SAMPLES = 2000        # single-row timings per candidate (test rows cycled), so p99 has ~20 points above it
+LOAD_REPEAT = 5
+
+
+def parse_grid(value, allow_none=False):
+    out = []
+    for item in value.split(','):
+        item = item.strip().lower()
+        out.append(None if allow_none and item in ('none', 'full') else int(item))
+    return out
+
+
+def distill_data(teacher, X_train, copies, noise, seed=SEED):
+    """(X, y, sample_weight) soft-label training set for a student forest."""
+    rnd = np.random.RandomState(seed)
+    jittered = [np.clip(X_train + rnd.normal(0, noise, X_train.shape), 0, 1) for _ in range(copies)]
+    X = np.vstack([X_train] + jittered)
+    p = teacher.predict_proba(X)[:, 1]
+    classes = teacher.classes_
+    X2 = np.vstack([X, X])
+    y2 = np.concatenate([np.full(len(X), classes[1]), np.full(len(X), classes[0])])
+    w2 = np.concatenate([p, 1 - p])
+    keep = w2 > 0
+    return X2[keep], y2[keep], w2[keep]
+
+
+def measure(model, X_test, y_test, workdir, name):
+    """Held-out metrics + compiled size, load time and single-row latency."""
+    metrics = evaluate(model, X_test, y_test)
+    path = os.path.join(workdir, f"{name}.npz")
+    forest = CompiledForest.from_sklearn(model)
+    forest.save(path)
+
+    load_times = []
+    for _ in range(LOAD_REPEAT):
+        t0 = time.perf_counter()
+        forest = CompiledForest.load(path)
+        load_times.append((time.perf_counter() - t0) * 1000)
+
+    rows = np.asarray(X_test[:LATENCY_ROWS])
+    forest.predict_proba(rows[:1])   # warm-up
+    latencies = []
+    for i in range(max(LATENCY_SAMPLES, len(rows))):
+        row = rows[i % len(rows)][None, :]
+        t0 = time.perf_counter()
+        forest.predict_proba(row)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        'name': name,
+        'n_trees': forest.n_estimators,
+        'n_nodes': forest.node_count,
+        'accuracy': metrics['accuracy'],
+        'roc_auc': metrics['roc_auc'],
+        'npz_mb': round(os.path.getsize(path) / 1e6, 3),
+        'load_ms': round(statistics.median(load_times), 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'metrics': metrics,
+    }
+
+
+def print_row(c, baseline_accuracy):
+    drop = baseline_accuracy - c['accuracy']
+    print(f"{c['name']:24} trees {c['n_trees']:5}  nodes {c['n_nodes']:8,}  acc {c['accuracy']:.4f} "
+          f"({-drop:+.4f})  auc {c['roc_auc']:.4f}  npz {c['npz_mb']:8.3f} MB  load {c['load_ms']:7.2f} ms  "
+          f"p50 {c['p50_ms']:6.3f} ms  p99 {c['p99_ms']:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--baseline-estimators', type=int, default=1000)
+    parser.add_argument('--n-estimators', default=DEFAULT_N_ESTIMATORS, help="comma-separated grid")
+    parser.add_argument('--max-depth', default=DEFAULT_MAX_DEPTH, help="comma-separated grid, 'none' = unbounded")
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help="largest held-out accuracy loss vs the baseline that is acceptable")
+    parser.add_argument('--distill', action='store_true', help="also fit students on the baseline's soft labels")
+    parser.add_argument('--distill-copies', type=int, default=20, help="jittered copies of the training rows")
+    parser.add_argument('--distill-noise', type=float, default=0.03, help="jitter std-dev in scaled units")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--registry', default=registry.REGISTRY_DIR)
+    parser.add_argument('--activate', action='store_true', help="make the chosen model CURRENT")
+    parser.add_argument('--json', help="write every candidate's measurements to this file")
+    args = parser.parse_args()
+
+    X, y, data_hash = load_data(args.data)
+    scaler, X_train, X_test, y_train, y_test = split_and_scale(X, y)
+    workdir = tempfile.mkdtemp(prefix='tune-')
+
+    baseline = build_model(args.baseline_estimators, None, args.n_jobs)
+    baseline.fit(X_train, y_train)
+    base = measure(baseline, X_test, y_test, workdir, f"baseline-{args.baseline_estimators}")
+    print_row(base, base['accuracy'])
+
+    distill_set = None
+    if args.distill:
+        distill_set = distill_data(baseline, X_train, args.distill_copies, args.distill_noise)
+
+    candidates = []
+    for n_estimators in parse_grid(args.n_estimators):
+        for max_depth in parse_grid(args.max_depth, allow_none=True):
+            variants = [('', X_train, y_train, None)]
+            if distill_set is not None:
+                variants.append(('distilled-', *distill_set))
+            for prefix, Xf, yf, weight in variants:
+                model = build_model(n_estimators, max_depth, args.n_jobs)
+                model.fit(Xf, yf, sample_weight=weight)
+                model.n_jobs = None
+                name = f"{prefix}{n_estimators}x{'full' if max_depth is None else max_depth}"
+                result = measure(model, X_test, y_test, workdir, name)
+                result.update(n_estimators=n_estimators, max_depth=max_depth, distilled=bool(prefix))
+                print_row(result, base['accuracy'])
+                candidates.append((result, model))
+
+    floor = base['accuracy'] - args.max_accuracy_drop
+    eligible = [(r, m) for r, m in candidates if r['accuracy'] >= floor]
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'baseline': base, 'floor': floor, 'candidates': [r for r, _ in candidates]}, f, indent=2)
+    if not eligible:
+        print(f"\nNo candidate within {args.max_accuracy_drop} of the baseline accuracy {base['accuracy']}.")
+        return 1
+
+    chosen, model = min(eligible, key=lambda rm: (rm[0]['npz_mb'], rm[0]['p50_ms']))
+    print(f"\nChosen: {chosen['name']}  ({chosen['npz_mb']} MB vs {base['npz_mb']} MB, "
+          f"p50 {chosen['p50_ms']} ms vs {base['p50_ms']} ms, accuracy {chosen['accuracy']} vs {base['accuracy']})")
+
+    version, _ = registry.publish(model, scaler, {
+        'features': list(X.columns),
+        'target': 'Outcome',
+        'classes': [int(c) for c in model.classes_],
+        'params': {k: v for k, v in model.get_params().items() if k != 'n_jobs'},
+        'data': {'path': os.path.relpath(args.data), 'sha256': data_hash,
+                 'n_train': int(len(y_train)), 'n_test': int(len(y_test)), 'seed': SEED},
+        # Published as measured: refitting on all rows would change the size/latency that chose it
+        'fit_on': 'train_split',
+        'metrics': chosen['metrics'],
+        'tuning': {
+            'candidate': chosen['name'],
+            'distilled': chosen['distilled'],
+            'baseline_estimators': args.baseline_estimators,
+            'baseline_metrics': base['metrics'],
+            'max_accuracy_drop': args.max_accuracy_drop,
+            'p50_ms': chosen['p50_ms'], 'p99_ms': chosen['p99_ms'], 'load_ms': chosen['load_ms'],
+            'baseline_p50_ms': base['p50_ms'], 'baseline_p99_ms': base['p99_ms'], 'baseline_load_ms': base['load_ms'],
+        },
+    }, registry=args.registry, make_current=args.activate)
+    print(f"Published {version}" + (" (now CURRENT)" if args.activate else
+                                     f"; serve it with: python registry.py activate {version}"))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())